@@ -1,9 +1,9 @@
 import tkinter as tk
-import yaml
 import os
+from pathlib import Path
+from Code.Imports.ConfigMaster import Config
 
-config_name = "config.yaml"
-directory = "C:/Users/kaiki/IdeaProjects/Project-1/Code/Imports"
+directory = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Imports"))
 
 
 class ConfigManager:
@@ -21,10 +21,7 @@ class ConfigManager:
         self.select_YAML_window()
 
     def find_config_files(self):
-        for root, _, files in os.walk(self.directory):
-            for file in files:
-                if file == config_name:
-                    self.files.append(os.path.join(root, file))
+        self.files = Config.find_config_files(self.directory)
 
 
     def select_YAML_window(self):
@@ -76,8 +73,8 @@ class ConfigManager:
         #print([x for x in [[index, list(data[index])] for index in list(data)]])
 
     def load_YAML(self, YAML_file):
-        with open(YAML_file, "r") as file:
-            return yaml.safe_load(file)
+        # Shares the parsed file (and its snapshot) with the rest of the engine
+        return Config.load_config_file(Path(YAML_file).resolve())
 
 if __name__ == "__main__":
     ConfigManager(directory)
\ No newline at end of file
@@ -0,0 +1,273 @@
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from Code.Imports.ConfigMaster import Config
+
+config = Config("HANDLER")
+character_config = Config("CHARACTER")
+logger = logging.getLogger(__name__)
+
+
+class Battle:
+    """
+    Resolves battles between teams of characters, every combatant at once.
+
+    Stats are stored as columns, one NumPy array per stat with an entry per combatant, so the stats of every attacker
+    and defender pair are computed together instead of a character at a time. Hidden stats use the same formulas as
+    Character.calculate_stats.
+
+    Within a turn every living combatant attacks a living enemy it expects to deal the most damage to, and every
+    attack lands at the same time, so two combatants can defeat each other in the same turn. Hit and critical rolls
+    come from a seeded generator, so a battle with the same seed always plays out the same way.
+    """
+
+    STATS = tuple(character_config.data["Stats"])  # Every character stat, laid out by the CHARACTER config
+    WEAPON_STATS = ("Might", "Hit", "Critical")
+
+    def __init__(self, teams: Sequence[Sequence["CharacterHandler.Character"]], seed: Optional[int] = None):
+        """
+        Initialize a battle.
+
+        Args:
+            teams (Sequence[Sequence[Character]]): The characters of each team. Characters are not changed.
+            seed (int, optional): Seed of the hit and critical rolls. Defaults to a random seed.
+        """
+        self.setup(*self.columns_of(teams), seed)
+
+    @classmethod
+    def columns_of(cls, teams: Sequence[Sequence["CharacterHandler.Character"]]) \
+            -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """
+        Get the stat columns of teams of characters, plain arrays that can be sent to other processes.
+
+        Args:
+            teams (Sequence[Sequence[Character]]): The characters of each team.
+
+        Returns:
+            Tuple[Dict[str, np.ndarray], np.ndarray]: The stat and weapon stat columns, and the team of each combatant.
+        """
+        characters = [character for team in teams for character in team]
+        weapons = [character.weapon_info() for character in characters]
+
+        stats = {
+            stat: np.array([character.stats[stat] for character in characters], dtype=np.int64)
+            for stat in cls.STATS
+        }
+        for stat in cls.WEAPON_STATS:
+            stats[f"Weapon {stat}"] = np.array([getattr(weapon, stat) for weapon in weapons], dtype=np.int64)
+        stats["Magic"] = np.array([weapon.Type == "Magic" for weapon in weapons], dtype=bool)
+        return stats, np.repeat(np.arange(len(teams)), [len(team) for team in teams])
+
+    @classmethod
+    def from_columns(cls, stats: Dict[str, np.ndarray], team: np.ndarray, seed: Any = None) -> "Battle":
+        """
+        Create a battle from stat columns, see columns_of.
+
+        Args:
+            stats (Dict[str, np.ndarray]): The stat and weapon stat columns.
+            team (np.ndarray): The team of each combatant.
+            seed (Any, optional): Seed of the hit and critical rolls. Defaults to a random seed.
+
+        Returns:
+            Battle: The battle.
+        """
+        battle = cls.__new__(cls)
+        battle.setup(stats, team, seed)
+        return battle
+
+    def setup(self, stats: Dict[str, np.ndarray], team: np.ndarray, seed: Any = None) -> None:
+        """
+        Set the stat columns and start the battle.
+
+        Args:
+            stats (Dict[str, np.ndarray]): The stat and weapon stat columns.
+            team (np.ndarray): The team of each combatant.
+            seed (Any, optional): Seed of the hit and critical rolls. Defaults to a random seed.
+        """
+        self.team = team
+        self.stats: Dict[str, np.ndarray] = dict(stats)
+        self.derive()
+        self.reset(seed)
+
+    def reset(self, seed: Any = None) -> None:
+        """
+        Start the battle again with full health, keeping the derived stats.
+
+        Args:
+            seed (Any, optional): Seed of the hit and critical rolls, anything np.random.default_rng takes.
+        """
+        self.health = self.stats["Health"].copy()  # Current health, the only column that changes in battle
+        self.dealt = np.zeros(len(self), dtype=np.int64)  # Damage dealt by each combatant
+        self.rng = np.random.default_rng(seed)
+        self.turns = 0
+
+    def __len__(self) -> int:
+        return len(self.team)
+
+    def derive(self) -> None:
+        """
+        Calculate the Attack, Hit, Avoid and Critical columns from the stat and weapon columns, and forecast
+        every attacker against every defender. Call again after changing a stat column.
+        """
+        stats = self.stats
+        stats["Attack"] = stats["Weapon Might"] + np.where(stats["Magic"], stats["Wisdom"], stats["Strength"])
+        stats["Hit"] = stats["Weapon Hit"] + stats["Dexterity"] * 2 + stats["Luck"] // 2
+        stats["Avoid"] = stats["Dexterity"] * 2 + stats["Luck"]
+        stats["Critical Chance"] = stats["Weapon Critical"] + stats["Critical"]
+        # Stats are fixed in battle, so every pair is forecast once
+        self.multiplier = config.data["Critical Multiplier"]
+        self.forecasts = self.matrix()
+        damage, hit, critical = self.forecasts
+        self.expected = damage * hit / 100 * (1 + (self.multiplier - 1) * critical / 100)
+        self.teams = int(self.team.max()) + 1 if len(self) else 0
+
+    def alive(self) -> np.ndarray:
+        """
+        Get which combatants are still standing.
+
+        Returns:
+            np.ndarray: True for every combatant with health left.
+        """
+        return self.health > 0
+
+    def forecast(self, attackers: np.ndarray, defenders: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Calculate the damage, hit chance and critical chance of attacks. Attackers and defenders broadcast, so an
+        attacker column against a defender row gives every pair.
+
+        Args:
+            attackers (np.ndarray): Combatant index of each attacker.
+            defenders (np.ndarray): Combatant index of each defender.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Damage of a normal hit, and hit and critical chance out of 100.
+        """
+        stats = self.stats
+        defence = np.where(stats["Magic"][attackers], stats["Resistance"][defenders], stats["Defence"][defenders])
+        damage = np.maximum(stats["Attack"][attackers] - defence, 0)
+        hit = np.clip(stats["Hit"][attackers] - stats["Avoid"][defenders], 0, 100)
+        critical = np.clip(stats["Critical Chance"][attackers] - stats["Luck"][defenders], 0, 100)
+        return damage, hit, critical
+
+    def matrix(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Forecast every attacker against every defender.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Damage, hit and critical chance, indexed [attacker, defender].
+        """
+        combatants = np.arange(len(self))
+        return self.forecast(combatants[:, None], combatants[None, :])
+
+    def expected_damage(self, attackers: np.ndarray, defenders: np.ndarray) -> np.ndarray:
+        """
+        Get the average damage of attacks.
+
+        Args:
+            attackers (np.ndarray): Combatant index of each attacker.
+            defenders (np.ndarray): Combatant index of each defender.
+
+        Returns:
+            np.ndarray: Average damage of each attack.
+        """
+        return self.expected[attackers, defenders]
+
+    def exchange(self, attackers: np.ndarray, defenders: np.ndarray) -> np.ndarray:
+        """
+        Resolve attacks at the same time, rolling hits and criticals.
+
+        Args:
+            attackers (np.ndarray): Combatant index of each attacker.
+            defenders (np.ndarray): Combatant index of each defender.
+
+        Returns:
+            np.ndarray: Damage dealt by each attack.
+        """
+        damage, hit, critical = (forecast[attackers, defenders] for forecast in self.forecasts)
+        rolls = self.rng.integers(0, 100, size=(2, len(attackers)))
+        hits = rolls[0] < hit
+        criticals = hits & (rolls[1] < critical)
+        dealt = np.where(hits, damage * np.where(criticals, self.multiplier, 1), 0)
+        np.subtract.at(self.health, defenders, dealt)  # A defender can be attacked more than once
+        np.add.at(self.dealt, attackers, dealt)
+        np.maximum(self.health, 0, out=self.health)
+        return dealt
+
+    def choose_targets(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pair every living combatant with a living enemy it expects to deal the most damage to.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Attackers and their targets, empty when no one has an enemy left.
+        """
+        alive = self.alive()
+        attackers = np.flatnonzero(alive)
+        valid = alive[None, :] & (self.team[attackers][:, None] != self.team[None, :])
+        expected = np.where(valid, self.expected[attackers], -1)
+        best = expected >= expected.max(axis=1, initial=-1)[:, None]
+        # Equally good targets are picked at random, so a team of equal characters spreads its attacks
+        targets = np.where(best, self.rng.random(expected.shape), -1).argmax(axis=1)
+        has_target = valid.any(axis=1)
+        return attackers[has_target], targets[has_target]
+
+    def turn(self) -> np.ndarray:
+        """
+        Play a turn, every living combatant attacking its chosen target.
+
+        Returns:
+            np.ndarray: Damage dealt by each attack.
+        """
+        attackers, targets = self.choose_targets()
+        self.turns += 1
+        return self.exchange(attackers, targets)
+
+    def teams_alive(self) -> List[int]:
+        """
+        Get the teams with a combatant still standing.
+
+        Returns:
+            List[int]: The team indexes.
+        """
+        return np.flatnonzero(np.bincount(self.team, weights=self.alive(), minlength=self.teams)).tolist()
+
+    def run(self, max_turns: Optional[int] = None) -> Optional[int]:
+        """
+        Play turns until one team is left or the turn limit is reached.
+
+        Args:
+            max_turns (int, optional): The turn limit. Defaults to the configured Max Turns.
+
+        Returns:
+            Optional[int]: The winning team, or None for a draw.
+        """
+        max_turns = config.data["Max Turns"] if max_turns is None else max_turns
+        while len(self.teams_alive()) > 1 and self.turns < max_turns:
+            self.turn()
+
+        teams = self.teams_alive()
+        winner = teams[0] if len(teams) == 1 else None
+        logger.debug(f"Battle over after {self.turns} turns, winner: {winner}")
+        return winner
+
+
+def load_battle_config(data=None):
+    """
+    Takes the stat columns from the CHARACTER config, whenever it changes on reload.
+
+    Args:
+        data (Dict[str, Any], optional): The updated CHARACTER config, the same dictionary as character_config.data.
+    """
+    Battle.STATS = tuple(character_config.data["Stats"])
+    logger.info("Battle configuration reloaded")
+
+
+character_config.subscribe(load_battle_config)
+
+
+# Example Usage
+if __name__ == "__main__":
+    import CharacterHandler
+
+    battle = Battle([[CharacterHandler.Character() for _ in range(3)], [CharacterHandler.Character() for _ in range(3)]],
+                    seed=0)
+    print(battle.run())
@@ -1,46 +1,196 @@
+import logging
+from array import array
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional
 import WeaponHandler
+from Code.Imports.ConfigMaster import Config
+
+config = Config("CHARACTER")
+logger = logging.getLogger(__name__)
+
+
+class StatLayout:
+    """
+    The stat set of characters, the position of each stat in a character's stat vector and its starting value.
+    """
+    __slots__ = ("index", "defaults")
+
+    def __init__(self, stats: Dict[str, int]):
+        """
+        Initialize a layout.
+
+        Args:
+            stats (Dict[str, int]): Every stat and its starting value, in storage order.
+        """
+        self.index = {name: i for i, name in enumerate(stats)}
+        self.defaults = array("i", stats.values())
+
+
+class Stats(MutableMapping):
+    """
+    A dictionary view of a character's stat vector. Setting a stat drops the character's memoized hidden stats.
+    """
+    __slots__ = ("character",)
+
+    def __init__(self, character: "Character"):
+        self.character = character
+
+    def __getitem__(self, name: str) -> int:
+        character = self.character
+        return character.values[character.layout.index[name]]
+
+    def __setitem__(self, name: str, value: int) -> None:
+        character = self.character
+        character.values[character.layout.index[name]] = value
+        character._hidden = None
+
+    def __delitem__(self, name: str) -> None:
+        raise TypeError("Character stats cannot be removed")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.character.layout.index)
+
+    def __len__(self) -> int:
+        return len(self.character.layout.index)
+
+
+class Info(MutableMapping):
+    """
+    A dictionary view of a character's Name and Weapon, the original Character.info dictionary. Setting Weapon equips
+    it like setting Character.weapon.
+    """
+    __slots__ = ("character",)
+    KEYS = ("Name", "Weapon")
+
+    def __init__(self, character: "Character"):
+        self.character = character
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "Name":
+            return self.character.name
+        if key == "Weapon":
+            return self.character.weapon
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key == "Name":
+            self.character.name = value
+        elif key == "Weapon":
+            self.character.weapon = value
+        else:
+            raise KeyError(key)
+
+    def __delitem__(self, key: str) -> None:
+        raise TypeError("Character info cannot be removed")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
 
 class Character:
-    def __init__(self):
-        self.info = {
-            "Name": "",
-            "Weapon": None
-        }
-        self.stats = {
-            "Level": 1,
-            "Strength": 3,
-            "Wisdom": 1,
-            "Dexterity": 2,
-            "Defence": 0,
-            "Resistance":2,
-            "Luck": 0,
-            "Critical": 5
-        }
-        self.hidden_stats = {
-            "Attack": 0,
-            "Hit": 0,
-            "Avoid": 0,
-            "Critical": 0
-        }
+    """
+    A character, stored compactly enough to keep a world of NPCs in memory.
+
+    Stats are kept in an integer array laid out by the CHARACTER config, shared by every character created with the
+    same config, and read or set through the stats view. Hidden stats are calculated on first use and kept until a
+    stat is set or a weapon is equipped. Equip the weapon again to pick up changes to its weapon file.
+    """
+    __slots__ = ("name", "layout", "values", "_weapon", "_hidden")
+    LAYOUT = StatLayout(config.data["Stats"])  # Layout of new characters
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.layout = self.LAYOUT  # Kept per character, so characters made before a config reload still read right
+        self.values = self.layout.defaults[:]
+        self._weapon = None
+        self._hidden = None  # Hidden stats, None until calculated
+
+    @property
+    def stats(self) -> Stats:
+        return Stats(self)
+
+    @property
+    def info(self) -> Info:
+        return Info(self)
+
+    @property
+    def weapon(self) -> Optional[WeaponHandler.Weapon]:
+        return self._weapon
+
+    @weapon.setter
+    def weapon(self, weapon: Optional[WeaponHandler.Weapon]) -> None:
+        self._weapon = weapon
+        self._hidden = None
+
+    @property
+    def hidden_stats(self) -> Dict[str, int]:
+        """
+        The hidden stats, calculated again only after a stat is set or a weapon is equipped.
+
+        Returns:
+            Dict[str, int]: Attack, Hit, Avoid and Critical.
+        """
+        if self._hidden is None:
+            self._hidden = self.calculate_stats()
+        return self._hidden
 
+    def weapon_info(self) -> Any:
+        """
+        Get the equipped weapon, or a default weapon when unarmed.
 
-    def calculate_stats(self):
+        Returns:
+            WeaponInfo: The equipped weapon.
+        """
+        return self._weapon.info if self._weapon is not None else WeaponHandler.WeaponInfo()
+
+    def calculate_stats(self, weapon: Any = None) -> Dict[str, int]:
+        """
+        Calculate the hidden stats from the stats and the equipped weapon. BattleHandler uses the same formulas.
+
+        Attack is the weapon's Might plus Wisdom for magic weapons, or Strength otherwise. Hit is the weapon's Hit plus
+        twice Dexterity plus half Luck, Avoid is twice Dexterity plus Luck, and Critical is the weapon's Critical plus
+        the Critical stat.
+
+        Args:
+            weapon (WeaponInfo, optional): The equipped weapon. Defaults to looking it up.
+
+        Returns:
+            Dict[str, int]: Attack, Hit, Avoid and Critical.
+        """
+        weapon = weapon or self.weapon_info()
+        stats = self.stats
+        power = stats["Wisdom"] if weapon.Type == "Magic" else stats["Strength"]
         calc_stats = {
-            "Attack": 0,
-            "Hit": 0,
-            "Avoid": 0,
-            "Critical": 0
+            "Attack": weapon.Might + power,
+            "Hit": weapon.Hit + stats["Dexterity"] * 2 + stats["Luck"] // 2,
+            "Avoid": stats["Dexterity"] * 2 + stats["Luck"],
+            "Critical": weapon.Critical + stats["Critical"]
         }
 
         return calc_stats
 
-    def select_weapon(self, weapon):
-        self.info["Weapon"] = WeaponHandler.Weapon(weapon)
-        print(self.info["Weapon"].info)
+    def select_weapon(self, weapon: str) -> None:
+        self.weapon = WeaponHandler.Weapon(weapon)
+        logger.info(f"{self.name or 'Character'} equipped {self.weapon.info}")
+
+
+def load_character_config(data=None):
+    """
+    Lays out new characters by the CHARACTER config, whenever it changes on reload.
+
+    Args:
+        data (Dict[str, Any], optional): The updated CHARACTER config, the same dictionary as config.data.
+    """
+    Character.LAYOUT = StatLayout(config.data["Stats"])
+    logger.info("Character configuration reloaded")
+
+
+config.subscribe(load_character_config)
 
 
 if __name__ == "__main__":
     char = Character()
     char.select_weapon("weapon1")
-
-
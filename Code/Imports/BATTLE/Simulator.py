@@ -0,0 +1,182 @@
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import BattleHandler
+
+if TYPE_CHECKING:
+    import CharacterHandler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SimulationResult:
+    """
+    The outcome of many battles between the same teams, one entry per battle in seed order.
+
+    Attributes:
+        winners (np.ndarray): The winning team of each battle, -1 for a draw.
+        turns (np.ndarray): The turns each battle took.
+        damage (np.ndarray): The damage each team dealt, indexed [battle, team].
+    """
+    winners: np.ndarray
+    turns: np.ndarray
+    damage: np.ndarray
+
+    @property
+    def battles(self) -> int:
+        return len(self.winners)
+
+    @property
+    def win_rates(self) -> np.ndarray:
+        """
+        The fraction of battles each team won.
+        """
+        return np.bincount(self.winners[self.winners >= 0], minlength=self.damage.shape[1]) / max(1, self.battles)
+
+    @property
+    def draw_rate(self) -> float:
+        return float(np.mean(self.winners < 0)) if self.battles else 0.0
+
+    @property
+    def mean_turns(self) -> float:
+        return float(self.turns.mean()) if self.battles else 0.0
+
+    def damage_percentiles(self, percentiles: Sequence[float] = (5, 25, 50, 75, 95)) -> np.ndarray:
+        """
+        Get percentiles of the damage each team dealt per battle.
+
+        Args:
+            percentiles (Sequence[float]): The percentiles to get.
+
+        Returns:
+            np.ndarray: Damage indexed [team, percentile].
+        """
+        if not self.battles:
+            return np.zeros((self.damage.shape[1], len(percentiles)))
+        return np.percentile(self.damage, percentiles, axis=0).T
+
+    def summary(self) -> str:
+        """
+        Describe the result, a line per team.
+
+        Returns:
+            str: The summary.
+        """
+        lines = [f"{self.battles} battles, mean {self.mean_turns:.2f} turns, {self.draw_rate:.2%} draws"]
+        means = self.damage.mean(axis=0) if self.battles else np.zeros(self.damage.shape[1])
+        for team, (rate, mean, damage) in enumerate(zip(self.win_rates, means, self.damage_percentiles())):
+            lines.append(f"Team {team}: {rate:.2%} wins, damage mean {mean:.1f}, "
+                         f"5/25/50/75/95th percentile {'/'.join(f'{value:g}' for value in damage)}")
+        return "\n".join(lines)
+
+
+def simulate_chunk(stats: Dict[str, np.ndarray], team: np.ndarray, teams: int, seed: int, start: int, stop: int,
+                   max_turns: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Run battles start to stop of a simulation. Battle i is always seeded from (seed, i), so results do not depend on
+    how battles are split between workers.
+
+    Args:
+        stats (Dict[str, np.ndarray]): The stat columns, see Battle.columns_of.
+        team (np.ndarray): The team of each combatant.
+        teams (int): The number of teams.
+        seed (int): Seed of the simulation.
+        start (int): The first battle.
+        stop (int): The battle after the last.
+        max_turns (int): Turns before a battle is a draw.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Winners, turns and damage, see SimulationResult.
+    """
+    battle = BattleHandler.Battle.from_columns(stats, team)
+    winners = np.empty(stop - start, dtype=np.int64)
+    turns = np.empty(stop - start, dtype=np.int64)
+    damage = np.empty((stop - start, teams), dtype=np.int64)
+    for i in range(start, stop):
+        battle.reset(np.random.SeedSequence(seed, spawn_key=(i,)))
+        winner = battle.run(max_turns)
+        winners[i - start] = -1 if winner is None else winner
+        turns[i - start] = battle.turns
+        damage[i - start] = np.bincount(team, weights=battle.dealt, minlength=teams)
+    return winners, turns, damage
+
+
+def simulate(teams: Sequence[Sequence["CharacterHandler.Character"]], battles: int, seed: int = 0,
+             workers: Optional[int] = None, chunk_size: int = 1000,
+             max_turns: Optional[int] = None) -> SimulationResult:
+    """
+    Run many seeded battles between teams, split between worker processes.
+
+    Characters are turned into stat columns first, so only plain arrays are sent to the workers. The result is the
+    same for any number of workers.
+
+    Args:
+        teams (Sequence[Sequence[Character]]): The characters of each team.
+        battles (int): The number of battles.
+        seed (int): Seed of the simulation.
+        workers (int, optional): Worker processes, 1 to run in this process. Defaults to the number of CPUs.
+        chunk_size (int): Battles sent to a worker at a time.
+        max_turns (int, optional): Turns before a battle is a draw. Defaults to the configured Max Turns.
+
+    Returns:
+        SimulationResult: The outcome of every battle.
+    """
+    stats, team = BattleHandler.Battle.columns_of(teams)
+    max_turns = BattleHandler.config.data["Max Turns"] if max_turns is None else max_turns
+    workers = workers or os.cpu_count() or 1
+    bounds = [(start, min(start + chunk_size, battles)) for start in range(0, battles, chunk_size)]
+    logger.info(f"Simulating {battles} battles in {len(bounds)} chunks on {workers} workers")
+
+    if workers == 1:
+        chunks = [simulate_chunk(stats, team, len(teams), seed, start, stop, max_turns) for start, stop in bounds]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(simulate_chunk, stats, team, len(teams), seed, start, stop, max_turns)
+                       for start, stop in bounds]
+            chunks = [future.result() for future in futures]
+
+    if not chunks:
+        return SimulationResult(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+                                np.empty((0, len(teams)), dtype=np.int64))
+    return SimulationResult(*(np.concatenate(column) for column in zip(*chunks)))
+
+
+def build_party(weapons: List[str]) -> List["CharacterHandler.Character"]:
+    """
+    Build a party of default characters.
+
+    Args:
+        weapons (List[str]): The weapon reference of each character, "-" for unarmed.
+
+    Returns:
+        List[Character]: The party.
+    """
+    import CharacterHandler
+
+    party = []
+    for weapon in weapons:
+        character = CharacterHandler.Character()
+        if weapon != "-":
+            character.select_weapon(weapon)
+        party.append(character)
+    return party
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate battles between two parties of default characters.")
+    parser.add_argument("--a", nargs="+", default=["Weapon1"] * 3, help="Weapons of party A, - for unarmed")
+    parser.add_argument("--b", nargs="+", default=["Weapon2"] * 3, help="Weapons of party B, - for unarmed")
+    parser.add_argument("--battles", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    result = simulate([build_party(args.a), build_party(args.b)], args.battles, args.seed, args.workers,
+                      args.chunk_size)
+    print(result.summary())
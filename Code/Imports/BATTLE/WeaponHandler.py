@@ -1,7 +1,7 @@
 import logging
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
 from dataclasses import make_dataclass, field, fields
-from functools import lru_cache, cached_property
+from collections import OrderedDict
 import os
 from Code.Imports.ConfigMaster import Config
 from Code.Imports import LogConfig
@@ -9,9 +9,53 @@ from Code.Imports import LogConfig
 config = Config("WEAPON")
 logger = logging.getLogger(__name__)
 
+def make_field_parser(name: str, convert: Callable[[str], Any], default: Any,
+                      allowed: Optional[List[Any]]) -> Callable[[str, str], Any]:
+    """
+    Build the parser of a single WeaponInfo field.
+
+    Args:
+        name (str): The field name, for log messages.
+        convert (Callable[[str], Any]): Converts the raw text of the field.
+        default (Any): The value of a missing or invalid field.
+        allowed (List[Any], optional): The values the field may take, the first being used for anything else.
+
+    Returns:
+        Callable[[str, str], Any]: Takes the raw text and the weapon reference, and returns the field value.
+    """
+    allowed_set = frozenset(allowed) if allowed else None
+
+    def parse(raw_value: str, reference: str) -> Any:
+        if raw_value == "":
+            logger.warning(f"Missing data for field '{name}' in weapon '{reference}'. Using default value: {default}")
+            return default
+        try:
+            value = convert(raw_value)
+        except (ValueError, TypeError):
+            logger.warning(f"Missing or invalid data for field '{name}' in weapon '{reference}'."
+                           f"Using default value: {default}")
+            return default
+        if allowed_set is not None and value not in allowed_set:
+            logger.warning(f"Invalid value '{value}' for field '{name}' in weapon '{reference}'."
+                           f"Allowed values are {allowed}. Using default value: {allowed[0]}")
+            return allowed[0]
+        return value
+
+    return parse
+
+
+def parse_list_field(raw_value: str, reference: str) -> Tuple[str, ...]:
+    """
+    Parse a comma separated list field, empty when missing.
+    """
+    return tuple(raw_value.split(",")) if raw_value else ()
+
+
 def create_weapon_info_class(details: List[Dict[str, Any]]):
     """
-    Dynamically create a WeaponInfo class based on the detail's configuration.
+    Dynamically create a frozen, slotted WeaponInfo class based on the detail's configuration.
+
+    The parser of every field is built here once, and kept on the class as PARSERS in field order.
 
     Args:
         details (List[Dict[str, Any]]): List of dictionaries defining the attributes.
@@ -20,42 +64,82 @@ def create_weapon_info_class(details: List[Dict[str, Any]]):
         type: A dynamically created dataclass for WeaponInfo.
     """
     fields = []
+    parsers = []
     DEFAULTS = {
         "string": "",
         "integer": 0,
-        "list": lambda: [],  # New list for each field
+        "list": (),
+    }
+    TYPES = {
+        "string": str,
+        "integer": int,
+        "list": Tuple[str, ...],
     }
 
     for detail in details:
         name = detail["name"]
         dtype = detail["type"]
         default = detail.get("default", None)
+        if dtype not in TYPES:
+            raise ValueError(f"Unsupported type '{dtype}' for field '{name}'.")
 
         # If the field name matches a key in the WEAPON config, use the first value from the config
+        allowed = config.data[name] if isinstance(config.data.get(name), list) else None
         if name in config.data:
             default = config.data[name][0]  # Take the first value from the list in the YAML config
 
         # If default is still None, fall back to hardcoded DEFAULTS
         if default is None:
-            default = DEFAULTS[dtype]() if callable(DEFAULTS[dtype]) else DEFAULTS[dtype]
+            default = DEFAULTS[dtype]
 
         if dtype == "list":
-            fields.append((name, List[str], field(default_factory=lambda d=default: d[:] if isinstance(d, list) else [])))
-        elif dtype == "integer":
-            fields.append((name, int, field(default=default)))
-        elif dtype == "string":
-            fields.append((name, str, field(default=default)))
+            default = tuple(default) if isinstance(default, (list, tuple)) else ()
+            parsers.append(parse_list_field)
         else:
-            raise ValueError(f"Unsupported type '{dtype}' for field '{name}'.")
+            parsers.append(make_field_parser(name, TYPES[dtype], default, allowed))
+        fields.append((name, TYPES[dtype], field(default=default)))
 
     # Dynamically create the WeaponInfo dataclass
-    return make_dataclass("WeaponInfo", fields)
+    return make_dataclass("WeaponInfo", fields, namespace={"PARSERS": tuple(parsers)}, frozen=True, slots=True)
 
 
 # Create the WeaponInfo class dynamically
 WeaponInfo = create_weapon_info_class(config.data["details"])
 
+
+def parse_weapon_record(raw: str, reference: str) -> WeaponInfo:
+    """
+    Parse the contents of a weapon file into a WeaponInfo, using defaults for missing or invalid fields.
+
+    Args:
+        raw (str): The weapon record, fields separated by the configured spacer.
+        reference (str): The weapon reference, for log messages.
+
+    Returns:
+        WeaponInfo: The parsed weapon.
+    """
+    parsers = WeaponInfo.PARSERS
+    raw_data = raw.split(config.data["SPACER"]) if raw else []
+    raw_data += [""] * (len(parsers) - len(raw_data))
+    return WeaponInfo(*[parse(raw_value, reference) for parse, raw_value in zip(parsers, raw_data)])
+
+
+def format_weapon_record(info: WeaponInfo) -> str:
+    """
+    Format a WeaponInfo as a weapon record, the reverse of parse_weapon_record.
+
+    Args:
+        info (WeaponInfo): The weapon.
+
+    Returns:
+        str: The weapon record.
+    """
+    return config.data["SPACER"].join(",".join(value) if isinstance(value, tuple) else str(value)
+                                      for value in (getattr(info, field.name) for field in fields(info)))
+
+
 class Weapon:
+    __slots__ = ("reference",)
     PATH = os.path.dirname(os.path.abspath(__file__))
     EXTENSION = config.data["EXTENSION"]
     DIRECTORY = config.data["DIRECTORY"]
@@ -63,10 +147,11 @@ class Weapon:
 
     def __init__(self, reference: str):
         self.reference = reference
-        self._info = None
 
-    @cached_property
+    @property
     def info(self) -> WeaponInfo:
+        if not registry.loaded:
+            registry.load_directory()
         return self.parse_weapon_data()
 
     def __getitem__(self, key: str):
@@ -86,53 +171,295 @@ class Weapon:
         return ""  # Return an empty string
 
     def write_weapon(self, info: WeaponInfo):
-        data = self.SPACER.join(str(getattr(info, field.name)) for field in fields(info))
+        data = format_weapon_record(info)
         try:
             with open(self.get_weapon_path(), "w") as file:
                 file.write(data)
         except Exception as e:
             raise IOError(f"Error writing weapon data: {e}")
+        weapon_cache.invalidate(self.reference)
+        if registry.loaded:
+            registry.add(self.reference, info, os.stat(self.get_weapon_path()).st_mtime_ns)
 
-    @lru_cache(maxsize=None)
     def parse_weapon_data(self) -> WeaponInfo:
-        raw_data = self.read_reference().split(self.SPACER) if self.read_reference() else []
-        weapon_data = {}
-
-        for i, field in enumerate(fields(WeaponInfo)):
-            try:
-                raw_value = raw_data[i] if i < len(raw_data) else ""
-
-                if field.type == List[str]:
-                    weapon_data[field.name] = raw_value.split(",") if raw_value else []
-                elif raw_value == "":
-                    weapon_data[field.name] = getattr(WeaponInfo, field.name)
-                    default_value = getattr(WeaponInfo, field.name)
-                    logger.warning(f"Missing data for field '{field.name}' in weapon '{self.reference}'."
-                                   f" Using default value: {default_value}")
-                else:
-                    parsed_value = field.type(raw_value) if raw_value else field.type()
-
-                    if field.name in config.data and isinstance(config.data[field.name], list):
-                        allowed_values = config.data[field.name]
-                        if parsed_value not in allowed_values:
-                            default_value = allowed_values[0]
-                            logger.warning(
-                                f"Invalid value '{parsed_value}' for field '{field.name}' in weapon '{self.reference}'."
-                                f"Allowed values are {allowed_values}. Using default value: {default_value}"
-                            )
-                            parsed_value = default_value
-
-                    weapon_data[field.name] = parsed_value
-
-            except (ValueError, TypeError):
-                default_value = getattr(WeaponInfo, field.name)
-                weapon_data[field.name] = default_value
-                logger.warning(
-                    f"Missing or invalid data for field '{field.name}' in weapon '{self.reference}'."
-                    f"Using default value: {default_value}"
-                )
-
-        return WeaponInfo(**weapon_data)
+        return weapon_cache.get(self.reference, self.get_weapon_path(), self.read_weapon_data)
+
+    def read_weapon_data(self, mtime: Optional[int]) -> WeaponInfo:
+        """
+        Get the weapon from the registry if it was loaded from the weapon file as it is now, otherwise parse the
+        weapon file and update the registry with it.
+
+        Args:
+            mtime (int, optional): Modification time of the weapon file, None if there is no file.
+
+        Returns:
+            WeaponInfo: The weapon.
+        """
+        if self.reference in registry and registry.mtimes.get(self.reference) == mtime:
+            return registry.get(self.reference)
+        info = parse_weapon_record(self.read_reference(), self.reference)
+        if registry.loaded and mtime is not None:
+            logger.info(f"Weapon file {self.get_weapon_path()} changed, updating the registry")
+            registry.add(self.reference, info, mtime)
+        return info
+
+
+class WeaponCache:
+    """
+    A bounded, process-wide cache of parsed weapon files.
+
+    Entries are keyed by weapon reference and checked against the file's modification time, so an edited file is
+    read again. Every Weapon lookup goes through the cache, registered weapons included. The least recently used
+    entry is evicted once the cache is full.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[str, Tuple[Optional[int], WeaponInfo]]" = OrderedDict()
+        self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, reference: str, path: str, parse: Callable[[Optional[int]], WeaponInfo]) -> WeaponInfo:
+        """
+        Get a parsed weapon, parsing it on a miss.
+
+        Args:
+            reference (str): The weapon reference.
+            path (str): The weapon file, checked for changes.
+            parse (Callable[[Optional[int]], WeaponInfo]): Takes the modification time of the weapon file, None if
+                there is no file, and parses it.
+
+        Returns:
+            WeaponInfo: The parsed weapon.
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:  # Missing weapons parse to a default weapon, cached until the file appears
+            mtime = None
+
+        entry = self.entries.get(reference)
+        if entry is not None and entry[0] == mtime:
+            self.hits += 1
+            self.entries.move_to_end(reference)
+            return entry[1]
+
+        self.misses += 1
+        info = parse(mtime)
+        self.entries[reference] = (mtime, info)
+        self.entries.move_to_end(reference)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return info
+
+    def invalidate(self, reference: Optional[str] = None) -> None:
+        """
+        Remove a weapon, or every weapon, from the cache.
+
+        Args:
+            reference (str, optional): The weapon reference. Defaults to every weapon.
+        """
+        if reference is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(reference, None)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache statistics.
+
+        Returns:
+            Dict[str, int]: Hits, misses, current size and maximum size.
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries), "maxsize": self.maxsize}
+
+
+# Shared by every Weapon
+weapon_cache = WeaponCache(config.data["CACHE SIZE"])
+
+
+class WeaponRegistry:
+    """
+    An in-memory table of weapons, loaded in one pass from the weapons directory or a packed catalogue file.
+
+    The table is columnar, one list per WeaponInfo field with a row per weapon, and is indexed by name, Type and
+    Range. Lookups hand out the same WeaponInfo instance for a weapon every time. The modification time of the file
+    each weapon was loaded from is kept, so Weapon can tell when a registered weapon's file changed.
+    """
+
+    INDEXED = ("Name", "Type", "Range")
+
+    def __init__(self):
+        self.loaded = False
+        self.references: List[str] = []
+        self.rows: Dict[str, int] = {}  # Reference > row
+        self.infos: List[WeaponInfo] = []
+        self.mtimes: Dict[str, int] = {}  # Reference > modification time of the weapon file it was loaded from
+        self.columns: Dict[str, List[Any]] = {}
+        self.indexes: Dict[str, Dict[Any, Set[int]]] = {column: {} for column in self.INDEXED}
+
+    def __len__(self) -> int:
+        return len(self.references)
+
+    def __contains__(self, reference: str) -> bool:
+        return reference in self.rows
+
+    def clear(self) -> None:
+        """
+        Remove every weapon from the table.
+        """
+        self.__init__()
+
+    def add(self, reference: str, info: WeaponInfo, mtime: Optional[int] = None) -> None:
+        """
+        Add a weapon to the table, or replace the weapon with the same reference.
+
+        Args:
+            reference (str): The weapon reference, its file name without extension.
+            info (WeaponInfo): The weapon.
+            mtime (int, optional): Modification time of the weapon file it was loaded from, None if not from a file.
+        """
+        if mtime is None:
+            self.mtimes.pop(reference, None)
+        else:
+            self.mtimes[reference] = mtime
+        if reference in self.rows:
+            row = self.rows[reference]
+            for column, index in self.indexes.items():
+                index[self.columns[column][row]].discard(row)
+            self.infos[row] = info
+            for field in fields(info):
+                self.columns[field.name][row] = getattr(info, field.name)
+        else:
+            row = self.rows[reference] = len(self.references)
+            self.references.append(reference)
+            self.infos.append(info)
+            for field in fields(info):
+                self.columns.setdefault(field.name, []).append(getattr(info, field.name))
+
+        for column, index in self.indexes.items():
+            index.setdefault(getattr(info, column), set()).add(row)
+
+    def load_directory(self, directory: Optional[str] = None) -> "WeaponRegistry":
+        """
+        Load every weapon file in a directory, each file opened once.
+
+        Args:
+            directory (str, optional): The directory to load. Defaults to the configured weapons directory.
+
+        Returns:
+            WeaponRegistry: The registry, for chaining.
+        """
+        directory = directory or os.path.join(Weapon.PATH, Weapon.DIRECTORY)
+        with os.scandir(directory) as entries:
+            for entry in sorted(entries, key=lambda item: item.name):
+                reference, extension = os.path.splitext(entry.name)
+                if extension == Weapon.EXTENSION and entry.is_file():
+                    with open(entry.path, "r") as file:
+                        info = parse_weapon_record(file.read(), reference)
+                    self.add(reference, info, entry.stat().st_mtime_ns)
+        self.loaded = True
+        logger.info(f"Loaded {len(self)} weapons from {directory}")
+        return self
+
+    def load_catalogue(self, path: str) -> "WeaponRegistry":
+        """
+        Load every weapon in a catalogue file, a line per weapon of its reference then its record.
+
+        Args:
+            path (str): The catalogue file.
+
+        Returns:
+            WeaponRegistry: The registry, for chaining.
+        """
+        with open(path, "r") as file:
+            for line in file.read().splitlines():
+                if line:
+                    reference, _, record = line.partition(Weapon.SPACER)
+                    self.add(reference, parse_weapon_record(record, reference))
+        self.loaded = True
+        logger.info(f"Loaded {len(self)} weapons from {path}")
+        return self
+
+    def write_catalogue(self, path: str) -> None:
+        """
+        Write every weapon in the table to a catalogue file.
+
+        Args:
+            path (str): The catalogue file.
+        """
+        with open(path, "w") as file:
+            for reference, info in zip(self.references, self.infos):
+                file.write(reference + Weapon.SPACER + format_weapon_record(info) + "\n")
+
+    def get(self, reference: str) -> Optional[WeaponInfo]:
+        """
+        Get a weapon by reference.
+
+        Args:
+            reference (str): The weapon reference.
+
+        Returns:
+            Optional[WeaponInfo]: The weapon, or None if it is not in the table.
+        """
+        row = self.rows.get(reference)
+        return None if row is None else self.infos[row]
+
+    def find(self, **criteria: Any) -> List[WeaponInfo]:
+        """
+        Find weapons through the indexes, e.g. find(Type="Magic", Range=2).
+
+        Args:
+            **criteria (Any): Values to match for any of the indexed columns.
+
+        Returns:
+            List[WeaponInfo]: The matching weapons, in table order.
+        """
+        rows: Optional[Set[int]] = None
+        for column, value in criteria.items():
+            if column not in self.indexes:
+                raise KeyError(f"Column '{column}' is not indexed, indexed columns are {self.INDEXED}")
+            matches = self.indexes[column].get(value, set())
+            rows = set(matches) if rows is None else rows & matches
+        rows = range(len(self.infos)) if rows is None else sorted(rows)
+        return [self.infos[row] for row in rows]
+
+    def column(self, name: str) -> List[Any]:
+        """
+        Get a column of the table, one value per weapon in table order.
+
+        Args:
+            name (str): The WeaponInfo field.
+
+        Returns:
+            List[Any]: The column.
+        """
+        return self.columns.get(name, [])
+
+
+# Shared by every Weapon, loaded on first use
+registry = WeaponRegistry()
+
+
+def load_weapon_config(data=None):
+    """
+    Rebuilds WeaponInfo and the weapon file settings from the WEAPON config, whenever it changes on reload.
+
+    Args:
+        data (Dict[str, Any], optional): The updated WEAPON config, the same dictionary as config.data.
+    """
+    global WeaponInfo
+    WeaponInfo = create_weapon_info_class(config.data["details"])
+    Weapon.EXTENSION, Weapon.DIRECTORY, Weapon.SPACER = (config.data[key] for key in ("EXTENSION", "DIRECTORY",
+                                                                                       "SPACER"))
+    weapon_cache.maxsize = config.data["CACHE SIZE"]
+    weapon_cache.invalidate()
+    registry.clear()
+    logger.info("Weapon configuration reloaded")
+
+
+config.subscribe(load_weapon_config)
 
 
 # Example Usage
@@ -0,0 +1,112 @@
+import unittest
+from unittest import mock
+import numpy as np
+import BattleHandler
+import CharacterHandler
+
+
+def columns(*combatants, team=None):
+    """
+    Builds battle stat columns, every stat 0 unless given
+    """
+
+    weapon_stats = tuple(f"Weapon {stat}" for stat in BattleHandler.Battle.WEAPON_STATS)
+    stats = {stat: np.array([combatant.get(stat, 0) for combatant in combatants], dtype=np.int64)
+             for stat in BattleHandler.Battle.STATS + weapon_stats}
+    stats["Magic"] = np.array([combatant.get("Magic", False) for combatant in combatants], dtype=bool)
+    return stats, np.array(team if team is not None else range(len(combatants)))
+
+
+class BattleTestCase(unittest.TestCase):
+    def test_battle_derive(self):
+        battle = BattleHandler.Battle.from_columns(*columns(
+            {"Strength": 5, "Wisdom": 2, "Dexterity": 3, "Luck": 4, "Critical": 1, "Defence": 2, "Resistance": 6,
+             "Weapon Might": 6, "Weapon Hit": 70, "Weapon Critical": 10},
+            {"Strength": 1, "Wisdom": 7, "Dexterity": 1, "Luck": 3, "Defence": 4, "Resistance": 1,
+             "Weapon Might": 4, "Weapon Hit": 50, "Magic": True}), seed=0)
+
+        # Attack is Might plus Strength, or Wisdom for magic. Hit is weapon Hit + 2 Dexterity + Luck // 2,
+        # Avoid is 2 Dexterity + Luck, and Critical Chance is weapon Critical + Critical
+        self.assertEqual(battle.stats["Attack"].tolist(), [11, 11], msg="Attack not as expected.")
+        self.assertEqual(battle.stats["Hit"].tolist(), [78, 53], msg="Hit not as expected.")
+        self.assertEqual(battle.stats["Avoid"].tolist(), [10, 5], msg="Avoid not as expected.")
+        self.assertEqual(battle.stats["Critical Chance"].tolist(), [11, 0], msg="Critical chance not as expected.")
+
+        # Physical attacks are reduced by Defence and magic ones by Resistance
+        damage, hit, critical = battle.forecast(np.array([0, 1]), np.array([1, 0]))
+        self.assertEqual(damage.tolist(), [7, 5], msg="Forecast damage not as expected.")
+        self.assertEqual(hit.tolist(), [73, 43], msg="Forecast hit not as expected.")
+        self.assertEqual(critical.tolist(), [8, 0], msg="Forecast critical not as expected.")
+        self.assertEqual([forecast.tolist() for forecast in battle.forecasts],
+                         [[[9, 7], [5, 10]], [[68, 73], [43, 48]], [[7, 8], [0, 0]]],
+                         msg="Forecast matrix not as expected.")
+        self.assertAlmostEqual(battle.expected_damage(0, 1), 7 * 0.73 * (1 + 2 * 0.08),
+                               msg="Expected damage not as expected.")
+
+    def test_battle_characters(self):
+        characters = [CharacterHandler.Character(), CharacterHandler.Character()]
+        characters[1].stats["Dexterity"] = 9
+        battle = BattleHandler.Battle([[characters[0]], [characters[1]]], seed=0)
+
+        # Columns derive the same hidden stats as each character
+        for index, character in enumerate(characters):
+            hidden = character.hidden_stats
+            self.assertEqual([battle.stats[stat][index] for stat in ("Attack", "Hit", "Avoid", "Critical Chance")],
+                             [hidden[stat] for stat in ("Attack", "Hit", "Avoid", "Critical")],
+                             msg="Battle stats differ from hidden stats.")
+
+    def test_battle_clip(self):
+        battle = BattleHandler.Battle.from_columns(*columns(
+            {"Weapon Hit": 300, "Weapon Critical": 300, "Health": 1},
+            {"Dexterity": 200, "Luck": 400, "Health": 1}), seed=0)
+
+        # Chances stay within 0 to 100
+        damage, hit, critical = battle.forecasts
+        self.assertEqual(hit.tolist(), [[100, 0], [100, 0]], msg="Hit chances not clipped.")
+        self.assertEqual(critical.tolist(), [[100, 0], [0, 0]], msg="Critical chances not clipped.")
+
+    def test_battle_seed(self):
+        stats, team = columns(*[{"Health": 20, "Strength": 3, "Dexterity": 2, "Luck": 1, "Critical": 5,
+                                 "Weapon Might": 2, "Weapon Hit": 60}] * 6, team=[0, 0, 0, 1, 1, 1])
+
+        # The same seed plays out the same battle
+        results = []
+        for _ in range(2):
+            battle = BattleHandler.Battle.from_columns(stats, team, seed=42)
+            results.append((battle.run(), battle.turns, battle.health.tolist(), battle.dealt.tolist()))
+        self.assertEqual(results[0], results[1], msg="Battles with the same seed differ.")
+        battle.reset(42)
+        self.assertEqual((battle.run(), battle.turns, battle.health.tolist(), battle.dealt.tolist()), results[0],
+                         msg="Reset battle differs.")
+
+    def test_battle_draw(self):
+        battle = BattleHandler.Battle.from_columns(*columns(
+            {"Health": 5, "Weapon Might": 10, "Weapon Hit": 200},
+            {"Health": 5, "Weapon Might": 10, "Weapon Hit": 200}), seed=0)
+
+        # Attacks land at the same time, so both combatants fall in the same turn
+        self.assertIsNone(battle.run(), msg="Simultaneous defeat not a draw.")
+        self.assertEqual((battle.turns, battle.health.tolist(), battle.dealt.tolist()), (1, [0, 0], [10, 10]),
+                         msg="Simultaneous defeat not as expected.")
+        self.assertEqual(battle.teams_alive(), [], msg="Defeated team still alive.")
+
+    def test_battle_max_turns(self):
+        stats, team = columns({"Health": 5, "Weapon Hit": 200}, {"Health": 5, "Weapon Hit": 200})
+
+        # Battles where no one takes damage are cut off at the turn limit
+        battle = BattleHandler.Battle.from_columns(stats, team, seed=0)
+        self.assertIsNone(battle.run(max_turns=5), msg="Battle past the turn limit not a draw.")
+        self.assertEqual(battle.turns, 5, msg="Turn limit not kept.")
+        with mock.patch.dict(BattleHandler.config.data, {"Max Turns": 3}):
+            battle.reset(0)
+            self.assertIsNone(battle.run(), msg="Battle past the configured turn limit not a draw.")
+        self.assertEqual(battle.turns, 3, msg="Configured turn limit not kept.")
+
+        # A battle won before the limit stops there
+        stats["Weapon Might"][0] = 5
+        battle = BattleHandler.Battle.from_columns(stats, team, seed=0)
+        self.assertEqual((battle.run(max_turns=5), battle.turns), (0, 1), msg="Won battle not as expected.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from unittest import mock
+import os
+import tempfile
+import CharacterHandler
+import WeaponHandler
+
+
+class CharacterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = WeaponHandler.Weapon.PATH
+        WeaponHandler.Weapon.PATH = self.directory.name
+        os.mkdir(os.path.join(self.directory.name, WeaponHandler.Weapon.DIRECTORY))
+        WeaponHandler.registry.clear()
+        WeaponHandler.weapon_cache.invalidate()
+        for reference, record in (("Sword", "Sword;3;1;80;0;A sword;Physical;;"),
+                                  ("Staff", "Staff;4;2;70;5;A staff;Magic;;")):
+            with open(WeaponHandler.Weapon(reference).get_weapon_path(), "w") as file:
+                file.write(record)
+
+    def tearDown(self):
+        WeaponHandler.Weapon.PATH = self.path
+        WeaponHandler.registry.clear()
+        WeaponHandler.weapon_cache.invalidate()
+        self.directory.cleanup()
+
+    def test_character_hidden_stats(self):
+        character = CharacterHandler.Character("Hero")
+        character.select_weapon("Sword")
+        hidden = character.hidden_stats
+        self.assertEqual(hidden, {"Attack": 6, "Hit": 84, "Avoid": 4, "Critical": 5},
+                         msg="Hidden stats not as expected.")
+
+        # Hidden stats are reused without looking the weapon up again
+        lookups = WeaponHandler.weapon_cache.stats()
+        self.assertIs(character.hidden_stats, hidden, msg="Hidden stats not reused.")
+        self.assertEqual(WeaponHandler.weapon_cache.stats(), lookups, msg="Weapon looked up to read hidden stats.")
+
+        # Setting a stat calculates them again
+        character.stats["Strength"] = 5
+        self.assertIsNot(character.hidden_stats, hidden, msg="Hidden stats not invalidated by a stat.")
+        self.assertEqual(character.hidden_stats["Attack"], 8, msg="Hidden stats not updated for a stat.")
+
+        # So does equipping a different weapon, through select_weapon, weapon or info
+        hidden = character.hidden_stats
+        character.select_weapon("Staff")
+        self.assertIsNot(character.hidden_stats, hidden, msg="Hidden stats not invalidated by a weapon.")
+        self.assertEqual(character.hidden_stats["Attack"], 5, msg="Hidden stats not updated for a magic weapon.")
+        character.info["Weapon"] = WeaponHandler.Weapon("Sword")
+        self.assertEqual(character.hidden_stats["Attack"], 8, msg="Hidden stats not updated for an equipped weapon.")
+        character.weapon = None
+        self.assertEqual(character.hidden_stats, character.calculate_stats(WeaponHandler.WeaponInfo()),
+                         msg="Hidden stats not updated when unarmed.")
+
+    def test_character_views(self):
+        character = CharacterHandler.Character("Hero")
+        defaults = CharacterHandler.config.data["Stats"]
+
+        # The stats view follows the config layout, and writes land in the stat vector
+        self.assertEqual(list(character.stats), list(defaults), msg="Stat order not as expected.")
+        self.assertEqual(dict(character.stats), defaults, msg="Starting stats not as expected.")
+        character.stats.update(Luck=7, Level=2)
+        self.assertEqual(character.values[character.layout.index["Luck"]], 7, msg="Stat not written to the vector.")
+        self.assertEqual(dict(character.stats), {**defaults, "Luck": 7, "Level": 2}, msg="Stats not read back.")
+        self.assertEqual(dict(CharacterHandler.Character().stats), defaults, msg="Stats shared between characters.")
+        with self.assertRaises(KeyError):
+            character.stats["Speed"]
+        with self.assertRaises(TypeError):
+            del character.stats["Luck"]
+
+        # The info view reads and writes the name and weapon
+        weapon = WeaponHandler.Weapon("Sword")
+        self.assertEqual(dict(character.info), {"Name": "Hero", "Weapon": None}, msg="Info not as expected.")
+        character.info.update(Name="Villain", Weapon=weapon)
+        self.assertEqual((character.name, character.weapon), ("Villain", weapon), msg="Info not written.")
+        self.assertEqual(dict(character.info), {"Name": "Villain", "Weapon": weapon}, msg="Info not read back.")
+        with self.assertRaises(KeyError):
+            character.info["Level"] = 1
+
+        # New characters take a reloaded layout, existing ones keep theirs
+        stats = {"Level": 1, "Health": 30, "Speed": 4}
+        self.addCleanup(CharacterHandler.load_character_config)
+        with mock.patch.dict(CharacterHandler.config.data, {"Stats": stats}):
+            CharacterHandler.load_character_config()
+            reloaded = CharacterHandler.Character()
+            self.assertEqual(dict(reloaded.stats), stats, msg="Reloaded layout not used.")
+            self.assertEqual(character.stats["Luck"], 7, msg="Existing character changed by a reload.")
+
+
+if __name__ == '__main__':
+    unittest.main()
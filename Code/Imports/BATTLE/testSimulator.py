@@ -0,0 +1,46 @@
+import unittest
+import numpy as np
+import CharacterHandler
+import Simulator
+
+
+class SimulatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.teams = [[CharacterHandler.Character() for _ in range(3)],
+                      [CharacterHandler.Character() for _ in range(2)]]
+        for character in self.teams[1]:
+            character.stats["Strength"] = 5
+
+    def assertResultEqual(self, result, expected, msg):
+        for column in ("winners", "turns", "damage"):
+            np.testing.assert_array_equal(getattr(result, column), getattr(expected, column), err_msg=msg)
+
+    def test_simulate_workers(self):
+        result = Simulator.simulate(self.teams, 25, seed=7, workers=1, chunk_size=10)
+        self.assertEqual((result.battles, result.damage.shape), (25, (25, 2)), msg="Result shape not as expected.")
+        self.assertAlmostEqual(float(result.win_rates.sum()) + result.draw_rate, 1, msg="Rates do not add up.")
+
+        # Battles are seeded by their number, so the result is the same however they are split between workers
+        self.assertResultEqual(Simulator.simulate(self.teams, 25, seed=7, workers=2, chunk_size=10), result,
+                               msg="Result differs between workers.")
+        self.assertResultEqual(Simulator.simulate(self.teams, 25, seed=7, workers=1, chunk_size=4), result,
+                               msg="Result differs between chunk sizes.")
+        first = Simulator.SimulationResult(result.winners[:10], result.turns[:10], result.damage[:10])
+        self.assertResultEqual(Simulator.simulate(self.teams, 10, seed=7, workers=1), first,
+                               msg="Result differs for fewer battles.")
+
+    def test_simulate_empty(self):
+        result = Simulator.simulate(self.teams, 0, workers=1)
+
+        # No battles summarise to zeros instead of failing
+        self.assertEqual((result.battles, result.draw_rate, result.mean_turns), (0, 0.0, 0.0),
+                         msg="Empty result not as expected.")
+        self.assertEqual(result.win_rates.tolist(), [0, 0], msg="Empty win rates not as expected.")
+        self.assertEqual(result.damage_percentiles().shape, (2, 5), msg="Empty percentiles not as expected.")
+        summary = result.summary().splitlines()
+        self.assertEqual(summary[0], "0 battles, mean 0.00 turns, 0.00% draws", msg="Empty summary not as expected.")
+        self.assertEqual(len(summary), 3, msg="Empty summary not a line per team.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import os
+import tempfile
+import WeaponHandler
+
+
+class WeaponTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = WeaponHandler.Weapon.PATH
+        WeaponHandler.Weapon.PATH = self.directory.name
+        os.mkdir(os.path.join(self.directory.name, WeaponHandler.Weapon.DIRECTORY))
+        WeaponHandler.registry.clear()
+        WeaponHandler.weapon_cache.invalidate()
+
+    def tearDown(self):
+        WeaponHandler.Weapon.PATH = self.path
+        WeaponHandler.registry.clear()
+        WeaponHandler.weapon_cache.invalidate()
+        self.directory.cleanup()
+
+    def write_file(self, reference, record, mtime):
+        path = WeaponHandler.Weapon(reference).get_weapon_path()
+        with open(path, "w") as file:
+            file.write(record)
+        os.utime(path, ns=(mtime, mtime))
+
+    def test_weapon_file_edit(self):
+        self.write_file("Sword", "Sword;3;1;80;0;A sword;Physical;;", 10 ** 18)
+        weapon = WeaponHandler.Weapon("Sword")
+        hits = WeaponHandler.weapon_cache.hits
+
+        # Registered weapons are served from the registry through the cache
+        self.assertEqual(weapon["Might"], 3, msg="Weapon not as expected.")
+        self.assertIs(weapon.info, WeaponHandler.registry.get("Sword"), msg="Registered weapon not shared.")
+        self.assertEqual(WeaponHandler.weapon_cache.hits, hits + 1, msg="Weapon lookups not cached.")
+
+        # Editing the file is picked up by the weapon and the registry
+        self.write_file("Sword", "Sword;7;1;80;0;A sword;Physical;;", 10 ** 18 + 1)
+        self.assertEqual(weapon["Might"], 7, msg="Edited weapon file not read again.")
+        self.assertEqual(WeaponHandler.registry.get("Sword").Might, 7, msg="Registry not updated.")
+        self.assertEqual(WeaponHandler.registry.column("Might"), [7], msg="Registry column not updated.")
+
+    def test_weapon_write(self):
+        self.write_file("Staff", "Staff;2;2;70;0;A staff;Magic;;", 10 ** 18)
+        weapon = WeaponHandler.Weapon("Staff")
+        self.assertEqual(weapon["Type"], "Magic", msg="Weapon not as expected.")
+
+        # Written weapons are read back from the registry without parsing
+        weapon.write_weapon(WeaponHandler.WeaponInfo(Name="Staff", Might=4, Type="Magic"))
+        misses = WeaponHandler.weapon_cache.stats()["misses"]
+        self.assertEqual(weapon["Might"], 4, msg="Written weapon not as expected.")
+        self.assertIs(weapon.info, WeaponHandler.registry.get("Staff"), msg="Written weapon not registered.")
+        self.assertEqual(WeaponHandler.weapon_cache.stats()["misses"], misses + 1, msg="Written weapon not cached.")
+
+    def test_weapon_missing(self):
+        weapon = WeaponHandler.Weapon("Missing")
+
+        # Missing weapons are default weapons, left out of the registry
+        self.assertEqual(weapon.info, WeaponHandler.WeaponInfo(), msg="Missing weapon not the default weapon.")
+        self.assertNotIn("Missing", WeaponHandler.registry, msg="Missing weapon registered.")
+
+
+if __name__ == '__main__':
+    unittest.main()
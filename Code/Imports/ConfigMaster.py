@@ -1,85 +1,211 @@
 import yaml
 import logging
-from typing import Dict, Any, Optional
+import os
+import pickle
+import threading
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from pathlib import Path
-import inspect
+import sys
 
 logger = logging.getLogger(__name__)
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)  # libyaml's loader when PyYAML was built with it
 
 class Config:
     """
     A class to manage configuration settings for different modules.
+
+    Every config.yaml is parsed at most once per process, on first access to a module's data, and shared by every
+    Config object through a registry keyed by the resolved file path. Parsed files are also kept as a pickled snapshot
+    in __pycache__, so later processes only parse a file again when it changed.
+
+    Reloading a file updates the module dictionaries already handed out in place, so references such as
+    Section.variables stay current, and calls the subscribers of every module whose configuration changed.
     """
-    _cached_config: Optional[Dict[str, Any]] = None
-    _config_path: Optional[Path] = None
+    _registry: Dict[Path, Dict[str, Any]] = {}
+    _keys: Dict[Path, Tuple[str, int, int]] = {}  # Snapshot key of each file when it was last parsed
+    _subscribers: Dict[Tuple[Path, str], List[Callable[[Dict[str, Any]], None]]] = {}
 
-    def __init__(self, module_name: str):
+    def __init__(self, module_name: str, source: Optional[str] = None):
         """
         Initialize the Config object for a specific module.
 
         Args:
             module_name (str): The name of the module to load configuration for.
+            source (str, optional): A file in the same directory as the config.yaml to use, usually __file__.
+                Defaults to the file creating the Config object.
         """
         self.module_name = module_name
-        self.data = self.get_config()
+        self.config_path = self.resolve_config_path(source or sys._getframe(1).f_code.co_filename)
 
-    @classmethod
-    def resolve_config_path(cls) -> Path:
+    @property
+    def data(self) -> Dict[str, Any]:
         """
-        Resolve the path to the configuration file dynamically based on the importing file's directory.
+        The configuration data for the module, parsed on first access.
 
         Returns:
-            Path: The resolved path to the configuration file.
+            Dict[str, Any]: The configuration data for the module.
         """
-        if cls._config_path is not None:
-            return cls._config_path
+        return self.get_config()
 
-        # Inspect the call stack to find the importing file
-        stack = inspect.stack()
-        for frame_info in stack:
-            if frame_info.filename != __file__:  # Ignore ConfigMaster itself
-                importing_file = frame_info.filename
-                importing_dir = Path(importing_file).parent
-                break
-        else:
-            logger.error("Could not determine the importing file.")
-            raise RuntimeError("Unable to resolve the configuration path.")
+    @staticmethod
+    def resolve_config_path(source: str) -> Path:
+        """
+        Resolve the path to the configuration file next to a source file.
 
-        # Look for a config.yaml in the importing file's directory
-        config_path = importing_dir / "config.yaml"
+        Args:
+            source (str): A file in the same directory as the configuration file.
+
+        Returns:
+            Path: The resolved path to the configuration file.
+        """
+        config_path = Path(source).resolve().parent / "config.yaml"
         if not config_path.exists():
             logger.error(f"Configuration file {config_path} not found.")
-            raise FileNotFoundError(f"No configuration file found in {importing_dir}.")
-
-        logger.info(f"Resolved configuration file path: {config_path}")
-        cls._config_path = config_path
-        return cls._config_path
+            raise FileNotFoundError(f"No configuration file found in {config_path.parent}.")
+        return config_path
 
     @classmethod
-    def load_config_file(cls) -> Dict[str, Any]:
+    def load_config_file(cls, config_path: Path) -> Dict[str, Any]:
         """
-        Load the configuration file and cache it.
+        Load a configuration file into the registry, unless it is already there.
+
+        Args:
+            config_path (Path): The resolved path to the configuration file.
 
         Returns:
             Dict[str, Any]: The loaded configuration data.
         """
-        if cls._cached_config is not None:
-            return cls._cached_config
-
-        config_path = cls.resolve_config_path()
+        if config_path in cls._registry:
+            return cls._registry[config_path]
 
         try:
-            with config_path.open("r") as file:
-                cls._cached_config = yaml.safe_load(file) or {}
+            cls._registry[config_path] = cls.parse_config_file(config_path)
             logger.info(f"Successfully loaded configuration from {config_path}")
         except yaml.YAMLError as e:
             logger.error(f"Error parsing configuration file {config_path}: {e}")
-            cls._cached_config = {}
+            cls._registry[config_path] = {}
         except Exception as e:
             logger.error(f"Unexpected error loading configuration file: {e}")
-            cls._cached_config = {}
+            cls._registry[config_path] = {}
+
+        return cls._registry[config_path]
+
+    @classmethod
+    def parse_config_file(cls, config_path: Path) -> Dict[str, Any]:
+        """
+        Parse a configuration file, or read its snapshot if the file did not change.
+
+        Args:
+            config_path (Path): The resolved path to the configuration file.
+
+        Returns:
+            Dict[str, Any]: The parsed configuration data.
+
+        Raises:
+            yaml.YAMLError: If the file is not valid YAML.
+            OSError: If the file cannot be read.
+        """
+        key = cls.snapshot_key(config_path)
+        cls._keys[config_path] = key
+        data = cls.read_snapshot(config_path, key)
+        if data is None:
+            with config_path.open("r") as file:
+                data = yaml.load(file, Loader=Loader) or {}
+            cls.write_snapshot(config_path, key, data)
+        return data
+
+    @staticmethod
+    def snapshot_path(config_path: Path) -> Path:
+        """
+        Get the snapshot file of a configuration file.
+
+        Args:
+            config_path (Path): The resolved path to the configuration file.
+
+        Returns:
+            Path: The snapshot file in __pycache__ next to the configuration file.
+        """
+        return config_path.parent / "__pycache__" / f"{config_path.name}.snapshot"
+
+    @staticmethod
+    def snapshot_key(config_path: Path) -> Tuple[str, int, int]:
+        """
+        Get the key a snapshot must match to be used, the path, modification time and size of the configuration file.
+
+        Args:
+            config_path (Path): The resolved path to the configuration file.
+
+        Returns:
+            Tuple[str, int, int]: The snapshot key.
+        """
+        stat = config_path.stat()
+        return str(config_path), stat.st_mtime_ns, stat.st_size
+
+    @classmethod
+    def read_snapshot(cls, config_path: Path, key: Tuple[str, int, int]) -> Optional[Dict[str, Any]]:
+        """
+        Read the snapshot of a configuration file, if it matches the file.
+
+        Args:
+            config_path (Path): The resolved path to the configuration file.
+            key (Tuple[str, int, int]): The key of the configuration file.
+
+        Returns:
+            Optional[Dict[str, Any]]: The configuration data, or None if there is no matching snapshot.
+        """
+        try:
+            with cls.snapshot_path(config_path).open("rb") as file:
+                snapshot_key, data = pickle.load(file)
+        except Exception as e:  # Missing, corrupt, or naming something that no longer exists
+            logger.debug(f"Could not read configuration snapshot of {config_path}: {e}")
+            return None
+        if snapshot_key != key:
+            logger.debug(f"Snapshot of {config_path} is out of date")
+            return None
+        return data
+
+    @classmethod
+    def write_snapshot(cls, config_path: Path, key: Tuple[str, int, int], data: Dict[str, Any]) -> None:
+        """
+        Write the snapshot of a configuration file. Failing to write only logs, the snapshot is an optimisation.
 
-        return cls._cached_config
+        Args:
+            config_path (Path): The resolved path to the configuration file.
+            key (Tuple[str, int, int]): The key of the configuration file.
+            data (Dict[str, Any]): The parsed configuration data.
+        """
+        snapshot_path = cls.snapshot_path(config_path)
+        temp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            snapshot_path.parent.mkdir(exist_ok=True)
+            with temp_path.open("wb") as file:
+                pickle.dump((key, data), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, snapshot_path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.warning(f"Could not write configuration snapshot {snapshot_path}: {e}")
+            temp_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def find_config_files(directory: str) -> List[str]:
+        """
+        Find every configuration file under a directory, skipping caches and hidden directories.
+
+        Args:
+            directory (str): The directory to search.
+
+        Returns:
+            List[str]: Paths of the configuration files found.
+        """
+        found, stack = [], [directory]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith((".", "__")):
+                            stack.append(entry.path)
+                    elif entry.name == "config.yaml":
+                        found.append(entry.path)
+        return sorted(found)
 
     def get_config(self) -> Dict[str, Any]:
         """
@@ -88,11 +214,11 @@ class Config:
         Returns:
             Dict[str, Any]: The configuration data for the module.
         """
-        config_data = self.load_config_file()
+        config_data = self.load_config_file(self.config_path)
         if self.module_name in config_data:
             return config_data[self.module_name]
         else:
-            logger.warning(f"Module '{self.module_name}' not found in config.yaml")
+            logger.warning(f"Module '{self.module_name}' not found in {self.config_path}")
             return {}
 
     def get(self, key: str, default: Any = None) -> Any:
@@ -121,16 +247,136 @@ class Config:
         Raises:
             KeyError: If the key is not found in the configuration.
         """
-        if key in self.data:
-            return self.data[key]
+        data = self.data
+        if key in data:
+            return data[key]
         raise KeyError(f"Configuration key '{key}' not found for module '{self.module_name}'")
 
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Call a function whenever the configuration of this module changes on reload.
+
+        Args:
+            callback (Callable[[Dict[str, Any]], None]): Takes the updated configuration data for the module.
+        """
+        self._subscribers.setdefault((self.config_path, self.module_name), []).append(callback)
+
     @classmethod
-    def reload_config(cls) -> None:
+    def reload_config(cls, config_path: Optional[Path] = None) -> None:
         """
-        Force a reload of the configuration file, clearing the cache.
+        Force a reload of a configuration file, or of every loaded file. Modules whose configuration changed are
+        updated in place and their subscribers are called. A file that fails to parse keeps its current configuration.
+
+        Args:
+            config_path (Path, optional): The resolved path of the file to reload. Defaults to every loaded file.
         """
-        cls._cached_config = None
-        cls._config_path = None
-        cls.load_config_file()
-        logger.info("Configuration reloaded")
+        paths = [config_path] if config_path is not None else list(cls._registry)
+        for path in paths:
+            try:
+                new = cls.parse_config_file(path)
+            except (yaml.YAMLError, OSError) as e:
+                logger.error(f"Error reloading configuration file {path}, keeping current configuration: {e}")
+                continue
+
+            old = cls._registry.setdefault(path, {})
+            changed = [module for module in {**old, **new} if old.get(module) != new.get(module)]
+            for module in changed:
+                if isinstance(old.get(module), dict) and isinstance(new.get(module), dict):
+                    old[module].clear()
+                    old[module].update(new[module])
+                elif module in new:
+                    old[module] = new[module]
+                else:
+                    del old[module]
+
+            logger.info(f"Configuration reloaded from {path}, changed modules: {changed}")
+            for module in changed:
+                for callback in cls._subscribers.get((path, module), []):
+                    callback(old.get(module, {}))
+
+
+class ConfigWatcher:
+    """
+    Polls the loaded configuration files and reloads the ones that changed since they were parsed.
+
+    Call check from a game loop, attach to a Tk widget, or start a background thread. Subscriber callbacks run on the
+    thread that calls check, which is the watcher thread once started. Tk is not thread safe, so programs with a Tk
+    window must attach to it instead of starting the thread, which runs the callbacks on the Tk thread.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        """
+        Initialize the watcher.
+
+        Args:
+            interval (float): Seconds between polls of the background thread.
+        """
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._widget: Any = None  # Tk widget polled through, see attach
+        self._after: Optional[str] = None  # Pending Tk poll
+
+    def check(self) -> List[Path]:
+        """
+        Reload every loaded configuration file whose modification time or size changed.
+
+        Returns:
+            List[Path]: The files that were reloaded.
+        """
+        changed = []
+        for path, key in list(Config._keys.items()):
+            try:
+                current = Config.snapshot_key(path)
+            except OSError:  # Mid-save or removed, try again next poll
+                continue
+            if current != key:
+                Config.reload_config(path)
+                changed.append(path)
+        return changed
+
+    def start(self) -> None:
+        """
+        Start polling on a daemon thread.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ConfigWatcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching configuration files every {self.interval}s")
+
+    def attach(self, widget: Any) -> None:
+        """
+        Poll through a Tk widget's event loop with after(), so reloads and subscriber callbacks run on the Tk thread.
+
+        Args:
+            widget (Any): A Tk widget, usually the root window. Polling ends when it is destroyed or on stop.
+        """
+        self.stop()
+        self._widget = widget
+        self._after = widget.after(int(self.interval * 1000), self._poll)
+        logger.info(f"Watching configuration files every {self.interval}s on the Tk thread")
+
+    def stop(self) -> None:
+        """
+        Stop the polling thread or Tk polling.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._after is not None:
+            try:
+                self._widget.after_cancel(self._after)
+            except Exception as e:  # The widget was already destroyed
+                logger.debug(f"Could not cancel configuration poll: {e}")
+        self._widget = self._after = None
+
+    def _poll(self) -> None:
+        self.check()
+        self._after = self._widget.after(int(self.interval * 1000), self._poll)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
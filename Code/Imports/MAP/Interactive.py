@@ -1,6 +1,7 @@
 import tkinter as tk
 import Section
-from Code.Imports.ConfigMaster import Config
+import Renderer
+from Code.Imports.ConfigMaster import Config, ConfigWatcher
 import logging
 
 log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -20,9 +21,12 @@ class Section_GUI:
     """
 
     variables = Config("Interactive").data
-    variables["Inverse Tile"] = [inverse_colour(col) for col in variables["Tile Colour"]]
+    inverse_tile = []  # Text colour of each tile colour, set by load_variables
     GUI_feature = []
     paint = 0
+    tiles = []  # Grid buttons of the current layer, reused until the grid dimensions change
+    canvas = None  # Renderer.Tile_Canvas when the "Canvas" renderer is selected
+    grid_layer = None  # Layer the grid buttons show
 
     def __init__(self, section_obj):
         """
@@ -37,6 +41,19 @@ class Section_GUI:
         self.section_obj = section_obj
         self.create()
 
+    @classmethod
+    def load_variables(cls, variables=None):
+        """
+        Works out the values derived from config, again whenever the config changes
+
+        :param variables: dict: Updated config, the same dictionary as cls.variables
+        :return: None
+        """
+
+        # Kept out of cls.variables, the config dictionary reloads are compared against, and updated in place so
+        # renderers holding it stay current
+        cls.inverse_tile[:] = [inverse_colour(col) for col in cls.variables["Tile Colour"]]
+
     def draw_grid(self, frame):
         """
         Draws the working grid within a given frame
@@ -47,13 +64,22 @@ class Section_GUI:
         logging.debug("Creating Grid")
 
         # Cycle through each value in scope and create corresponding button
-        for pos, val in enumerate(self.section_obj.section):
-            row, col = divmod(pos, self.section_obj.section_width)
-            button = tk.Button(frame, bg=self.variables["Tile Colour"][val],
-                               fg=self.variables["Inverse Tile"][val], width=5, height=2, text=val, # Make this variable size
-                               command=lambda x=pos + (self.section_obj.current_layer * self.section_obj.section_height
-                                                       * self.section_obj.section_width): self.paint_tile(x))
-            button.grid(row=row + 1, column=col + 1, padx=1, pady=1)
+        self.tiles, self.canvas = [], None
+        if self.variables["Renderer"] == "Canvas":  # Or draw the whole layer on one canvas
+            self.canvas = Renderer.Tile_Canvas(frame, self.section_obj, self.variables, self.inverse_tile,
+                                               lambda x: self.paint_tile(x + self.layer_start()))
+            self.canvas.frame.grid(row=1, column=1, sticky="nsew")
+            frame.grid_rowconfigure(1, weight=1)
+            frame.grid_columnconfigure(1, weight=1)
+        else:
+            for pos, val in enumerate(self.section_obj.section):
+                row, col = divmod(pos, self.section_obj.section_width)
+                button = tk.Button(frame, bg=self.variables["Tile Colour"][val],
+                                   fg=self.inverse_tile[val], width=5, height=2, text=val, # Make this variable size
+                                   command=lambda x=pos: self.paint_tile(x + self.layer_start()))
+                button.grid(row=row + 1, column=col + 1, padx=1, pady=1)
+                self.tiles.append(button)
+        self.grid_layer = self.section_obj.current_layer
 
         # Grid buttons
         tk.Button(frame, text="-", bg="#FF6666", command=lambda: self.grid_adjust(height=-1)).grid(
@@ -76,7 +102,31 @@ class Section_GUI:
         """
 
         self.section_obj.paint_tile(index, self.paint)
-        self.update()
+        self.refresh_tile(index - self.layer_start())
+
+    def layer_start(self):
+        """
+        Gets the index of the first tile of the current layer in the section object
+
+        :return: int
+        """
+
+        return self.section_obj.current_layer * self.section_obj.section_height * self.section_obj.section_width
+
+    def refresh_tile(self, pos):
+        """
+        Reconfigures the grid button of a tile in the current layer to match the section object
+
+        :param pos: int: Position of the tile within the current layer
+        :return: None
+        """
+
+        if self.canvas is not None:
+            self.canvas.refresh_tile(pos)
+        elif 0 <= pos < len(self.tiles):
+            val = self.section_obj.section[pos]
+            self.tiles[pos].configure(bg=self.variables["Tile Colour"][val], fg=self.inverse_tile[val],
+                                      text=val)
 
     def grid_adjust(self, height=0, width=0):
         """
@@ -111,7 +161,7 @@ class Section_GUI:
         buttons = {"Edit Name": lambda: print(self.section_obj.data),
                    "Edit Tiles": lambda: print("two"),
                    "Options": lambda: print("three"),
-                   "Save": lambda: print("four"),
+                   "Save": self.save,
                    "Exit": lambda: print("five")}
         for command, index in enumerate(buttons):
             button = tk.Button(frame, text=index, command=buttons[index])
@@ -129,6 +179,16 @@ class Section_GUI:
 
         logging.debug(f"Toolbar Created.\nItems: {frame.winfo_children()}")
 
+    def save(self):
+        """
+        Saves the section object to a section file named after the section
+
+        :return: None
+        """
+
+        name = self.section_obj.section_name or "Untitled"
+        self.section_obj.save(name + self.section_obj.variables["File Extension"])
+
     def change_paint(self, val):
         """
         Changes the current paint value
@@ -137,8 +197,7 @@ class Section_GUI:
         :return: None
         """
 
-        self.paint = val
-        self.update()
+        self.paint = val  # The listbox already shows the selection, nothing to redraw
 
     def draw_information(self, frame):
         """
@@ -229,18 +288,31 @@ class Section_GUI:
 
     def update(self):
         """
-        Updates the GUI by clearing and redrawing all widgets in the GUI
+        Updates the GUI by clearing and redrawing the frames whose data changed since they were drawn.
+        The grid is only rebuilt when its dimensions change, a layer change recolours the existing buttons
 
         :param: :return: None
         """
 
         logging.debug("Updating GUI")
         for feature in self.GUI_feature:
+            state = feature[2]()
+            if self.drawn.get(feature[0]) == state:
+                continue
             # Clear frame
             self.clear_frame(feature[0])
             # Rewrite frame
             logging.debug(f"Performing {feature[1]} in frame {feature[0]}")
             feature[1](feature[0])
+            self.drawn[feature[0]] = state
+
+        if self.grid_layer != self.section_obj.current_layer:
+            logging.debug(f"Recolouring grid for layer {self.section_obj.current_layer}")
+            if self.canvas is not None:
+                self.canvas.redraw()
+            for pos in range(len(self.tiles)):
+                self.refresh_tile(pos)
+            self.grid_layer = self.section_obj.current_layer
 
     def create(self):
         """
@@ -259,35 +331,45 @@ class Section_GUI:
         screen_width, screen_height = window.winfo_screenwidth(), window.winfo_screenheight()
 
         # Set screen pixel dimensions
-        self.variables["Heightpx"], self.variables["Widthpx"] = screen_height * self.variables["Height Percentage"], \
-                                                                screen_width * self.variables["Width Percentage"]
+        height_px, width_px = screen_height * self.variables["Height Percentage"], \
+                              screen_width * self.variables["Width Percentage"]
 
         # Set geometry
-        window.geometry("%dx%d+%d+%d" % (self.variables["Widthpx"], self.variables["Heightpx"],
-                                         (screen_width - self.variables["Widthpx"]) // 2,
-                                         (screen_height - self.variables["Heightpx"]) // 2))
+        window.geometry("%dx%d+%d+%d" % (width_px, height_px, (screen_width - width_px) // 2,
+                                         (screen_height - height_px) // 2))
 
         # Configure grid row/column
         window.grid_columnconfigure(1, weight=1)
         window.grid_rowconfigure(1, weight=1)
 
-        # [geometry width, geometry height, column, row, draw function]
+        # [geometry width, geometry height, column, row, draw function, data the frame shows]
+        section = self.section_obj
         frames = [
-            [0.6, 0.85, 0, 0, self.draw_grid],
-            [0.25, 0.85, 2, 0, self.draw_toolbar],
-            [0.25, 0.85, 1, 0, self.draw_information],
-            [0.6, 0.2, 0, 1, self.draw_layers]]
+            [0.6, 0.85, 0, 0, self.draw_grid, lambda: (section.section_height, section.section_width,
+                                                        len(section.section))],
+            [0.25, 0.85, 2, 0, self.draw_toolbar, lambda: ()],
+            [0.25, 0.85, 1, 0, self.draw_information, lambda: (section.section_name, section.section_width,
+                                                                section.section_height, section.section_depth)],
+            [0.6, 0.2, 0, 1, self.draw_layers, lambda: (section.current_layer, section.section_depth)]]
+        self.GUI_feature, self.drawn = [], {}
 
         for index, item in enumerate(frames):
-            frame = tk.Frame(window, width=self.variables["Widthpx"] * item[0],
-                             height=self.variables["Heightpx"] * item[1], bg=self.variables["Grid Colour"][index])
+            frame = tk.Frame(window, width=width_px * item[0],
+                             height=height_px * item[1], bg=self.variables["Grid Colour"][index])
             frame.grid_propagate(False)
             frame.pack_propagate(False)
             frame.grid(column=item[2], row=item[3], sticky="ns", padx=5, pady=5)
-            self.GUI_feature.append((frame, item[4]))
+            self.GUI_feature.append((frame, item[4], item[5]))
 
         self.update()
+        watcher = ConfigWatcher()  # Reloads changed config on the Tk thread
+        watcher.attach(window)
         window.mainloop()
+        watcher.stop()
+
+
+Section_GUI.load_variables()
+Config("Interactive").subscribe(Section_GUI.load_variables)
 
 
 if __name__ == "__main__":
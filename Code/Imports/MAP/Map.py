@@ -1 +1,239 @@
-print("fucking finally")
\ No newline at end of file
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+import Section
+from Code.Imports.ConfigMaster import Config
+
+logger = logging.getLogger(__name__)
+
+
+class Map:
+    """
+    Composes many section objects into a chunked world grid.
+
+    Every chunk coordinate holds at most one section, which can be any shape up to the chunk size. Tiles of a chunk
+    outside its section are void (0). Only the most recently used sections are kept loaded, the rest are paged out
+    through the saver and paged back in through the loader when touched. By default sections are paged out to
+    section files in the map's page directory and memory mapped back in, so paged out chunks take no memory.
+    """
+
+    variables = Config("Map").data
+
+    def __init__(self, name=None, capacity=variables["Loaded Chunks"], loader=None, saver=None, directory=None):
+        """
+        Initialises map object
+
+        :param name: str: Name of map
+        :param capacity: int: Maximum amount of loaded sections
+        :param loader: callable: Takes chunk coordinates and returns the paged out Section. Default page file loader
+        :param saver: callable: Takes chunk coordinates and a Section to page out. Default page file saver
+        :param directory: str: Page directory for the default saver and loader. Default a temporary directory removed
+                          with the map
+        """
+
+        self.map_name = name
+        self.capacity = max(1, capacity)
+        self.chunk_width = self.chunk_height = self.variables["Chunk Size"]
+        self.loader = loader or self.load_page
+        self.saver = saver or self.save_page
+
+        self.temporary = None
+        if directory is None:
+            self.temporary = tempfile.TemporaryDirectory(prefix="map-")
+            directory = self.temporary.name
+        self.directory = directory
+
+        self.index = {}  # Spatial index, chunk coordinates > (width, height, depth) of its section
+        self.loaded = OrderedDict()  # Chunk coordinates > loaded Section, least recently used first
+
+    def close(self):
+        """
+        Drops every section and removes the temporary page directory, if the map made one
+        """
+
+        for chunk in list(self.index):
+            self.remove_section(chunk)
+        if self.temporary is not None:
+            self.temporary.cleanup()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, chunk):
+        return chunk in self.index
+
+    def chunk_of(self, x, y):
+        """
+        Splits world coordinates into chunk coordinates and coordinates within the chunk
+
+        :param x: int: World column
+        :param y: int: World row
+        :return: ((int, int), (int, int)): Chunk coordinates, local coordinates
+        """
+
+        cx, lx = divmod(x, self.chunk_width)
+        cy, ly = divmod(y, self.chunk_height)
+        return (cx, cy), (lx, ly)
+
+    def set_section(self, chunk, section):
+        """
+        Places a section at chunk coordinates, replacing any section already there
+
+        :param chunk: (int, int): Chunk coordinates
+        :param section: Section.Section: Section to place
+        """
+
+        if section.section_width > self.chunk_width or section.section_height > self.chunk_height:
+            raise ValueError(f"Section {section.section_width}x{section.section_height} does not fit in a "
+                             f"{self.chunk_width}x{self.chunk_height} chunk")
+
+        logger.info(f"Placing section {section.section_name} at chunk {chunk}")
+        self.remove_page(chunk)
+        self.index[chunk] = (section.section_width, section.section_height, section.section_depth)
+        self.loaded[chunk] = section
+        self.loaded.move_to_end(chunk)
+        self.evict()
+
+    def remove_section(self, chunk):
+        """
+        Removes the section at chunk coordinates
+
+        :param chunk: (int, int): Chunk coordinates
+        """
+
+        logger.info(f"Removing chunk {chunk}")
+        self.index.pop(chunk, None)
+        self.loaded.pop(chunk, None)
+        self.remove_page(chunk)
+
+    def get_section(self, chunk):
+        """
+        Gets the section at chunk coordinates, paging it in if needed
+
+        :param chunk: (int, int): Chunk coordinates
+        :return: Section.Section or None
+        """
+
+        if chunk not in self.index:
+            return None
+        if chunk in self.loaded:
+            self.loaded.move_to_end(chunk)
+            return self.loaded[chunk]
+
+        logger.debug(f"Paging in chunk {chunk}")
+        section = self.loader(chunk)
+        self.loaded[chunk] = section
+        self.evict()
+        return section
+
+    def evict(self):
+        """
+        Pages out least recently used sections until the loaded sections fit the capacity
+        """
+
+        while len(self.loaded) > self.capacity:
+            chunk, section = self.loaded.popitem(last=False)
+            logger.debug(f"Paging out chunk {chunk}")
+            self.index[chunk] = (section.section_width, section.section_height, section.section_depth)
+            self.saver(chunk, section)
+
+    def locate(self, x, y, layer=0):
+        """
+        Finds the section and data index of a world tile without paging anything in
+
+        :param x: int: World column
+        :param y: int: World row
+        :param layer: int: Layer of the tile
+        :return: ((int, int), int) or None: Chunk coordinates and index within the section data, None if void
+        """
+
+        chunk, (lx, ly) = self.chunk_of(x, y)
+        if chunk not in self.index:
+            return None
+        section = self.loaded.get(chunk)
+        if section is not None:  # Loaded sections may have been resized since they were indexed
+            width, height, depth = section.section_width, section.section_height, section.section_depth
+        else:
+            width, height, depth = self.index[chunk]
+        if lx >= width or ly >= height or not 0 <= layer < depth:
+            return None
+        return chunk, (layer * height + ly) * width + lx
+
+    def get_tile(self, x, y, layer=0):
+        """
+        Gets the value of a world tile
+
+        :param x: int: World column
+        :param y: int: World row
+        :param layer: int: Layer of the tile
+        :return: int: Tile value, 0 for void tiles
+        """
+
+        location = self.locate(x, y, layer)
+        if location is None:
+            return 0
+        chunk, index = location
+        return self.get_section(chunk).data[index]
+
+    def paint_tile(self, x, y, val, layer=0):
+        """
+        "Paints" a world tile to the paint value
+
+        :param x: int: World column
+        :param y: int: World row
+        :param val: int: Value to change into
+        :param layer: int: Layer of the tile
+        """
+
+        location = self.locate(x, y, layer)
+        if location is None:
+            logger.warning(f"Tile ({x}, {y}) on layer {layer} is not within a section")
+            return
+        chunk, index = location
+        self.get_section(chunk).paint_tile(index, val)
+
+    def page_path(self, chunk):
+        """
+        Gets the page file of a chunk
+
+        :param chunk: (int, int): Chunk coordinates
+        :return: str: Section file in the page directory
+        """
+
+        return os.path.join(self.directory, f"{chunk[0]}_{chunk[1]}{Section.Section.variables['File Extension']}")
+
+    def save_page(self, chunk, section):
+        """
+        Default saver, saves a section to its page file
+
+        :param chunk: (int, int): Chunk coordinates
+        :param section: Section.Section: Section to page out
+        """
+
+        section.save(self.page_path(chunk))
+
+    def load_page(self, chunk):
+        """
+        Default loader, memory maps a section from its page file
+
+        :param chunk: (int, int): Chunk coordinates
+        :return: Section.Section
+        """
+
+        return Section.Section.load(self.page_path(chunk), mmap=True)
+
+    def remove_page(self, chunk):
+        """
+        Removes the page file of a chunk, if the default saver wrote one
+
+        :param chunk: (int, int): Chunk coordinates
+        """
+
+        path = self.page_path(chunk)
+        for section in list(Section.Section.mapped.get(os.path.abspath(path), ())):
+            section.detach()
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,257 @@
+import logging
+import heapq
+import weakref
+from array import array
+from collections import OrderedDict, deque
+from Code.Imports.ConfigMaster import Config
+
+logger = logging.getLogger(__name__)
+
+
+class Pathfinder:
+    """
+    Finds paths between tiles of a section object.
+
+    Tiles are walkable when their tile type is listed under "Walkable Type" or "Stairs Type" in config.yaml. Agents move to the four
+    neighbouring tiles of a layer, between layers through stairs tiles, and through portals added with add_portal.
+    All positions are indexes of the section data, the same indexes paint_tile uses.
+    """
+
+    variables = Config("Pathfinding").data
+    section_variables = Config("Section").data
+    walkable, stairs = frozenset(), frozenset()  # Tile values, set by load_variables
+    instances = weakref.WeakSet()  # Live pathfinders, to drop their graphs when the config changes
+
+    def __init__(self, section_obj):
+        """
+        Initialises a pathfinder for a section object
+
+        :param section_obj: Section.Section: The section object to find paths in
+        """
+
+        self.section_obj = section_obj
+        self.portals = {}  # Index > set of indexes it links to
+        self.mask = None  # Navigation graph, 1 per walkable tile. Built on first use
+        self.flow_fields = OrderedDict()  # Target > distances, least recently used first
+        self.listener = section_obj.subscribe_method(self.invalidate)  # Dropped with the pathfinder
+        self.instances.add(self)
+
+    def close(self):
+        """
+        Stops following paints of the section object
+        """
+
+        if self.listener is not None:
+            self.section_obj.unsubscribe(self.listener)
+            self.listener = None
+
+    @classmethod
+    def load_variables(cls, variables=None):
+        """
+        Sets the walkable and stairs tile values from config, and drops every navigation graph built with old values
+
+        :param variables: dict: Updated config, unused as both Section and Pathfinding config are read
+        """
+
+        tile_types = cls.section_variables["Tile Type"]
+        cls.walkable = frozenset(map(tile_types.index, cls.variables["Walkable Type"] + cls.variables["Stairs Type"]))
+        cls.stairs = frozenset(map(tile_types.index, cls.variables["Stairs Type"]))
+        for pathfinder in list(cls.instances):
+            pathfinder.invalidate(None)
+
+    def invalidate(self, indices):
+        """
+        Section listener, updates the navigation graph for painted tiles
+
+        :param indices: [int]: Painted indexes, or None when the section was resized
+        """
+
+        if self.mask is None:
+            return
+        if indices is None:
+            logger.debug("Section resized, dropping navigation graph")
+            self.mask = None
+            self.flow_fields.clear()
+            return
+
+        changed = False
+        for index in indices:
+            walkable = self.section_obj.data[index] in self.walkable
+            if self.mask[index] != walkable:
+                self.mask[index], changed = walkable, True
+        if changed:
+            self.flow_fields.clear()
+
+    def navigation(self):
+        """
+        Gets the navigation graph, building it if the section was resized or never used
+
+        :return: bytearray: 1 for every walkable tile of the section data
+        """
+
+        if self.mask is None:
+            logger.debug("Building navigation graph")
+            self.mask = bytearray(tile in self.walkable for tile in self.section_obj.data)
+        return self.mask
+
+    def add_portal(self, start, end, both=True):
+        """
+        Links two tiles so agents can move between them in one step
+
+        :param start: int: Index the portal is entered from
+        :param end: int: Index the portal leads to
+        :param both: bool: Also link end back to start
+        """
+
+        self.portals.setdefault(start, set()).add(end)
+        if both:
+            self.portals.setdefault(end, set()).add(start)
+        self.flow_fields.clear()
+
+    def adjacent(self, index):
+        """
+        Gets the walkable tiles next to a tile within its layer, or through stairs. Adjacency works both ways
+
+        :param index: int: Index of the tile
+        :return: [int]: Walkable indexes
+        """
+
+        mask, data = self.navigation(), self.section_obj.data
+        width, area = self.section_obj.section_width, self.section_obj.section_width * self.section_obj.section_height
+        x, layer = index % width, index // area
+
+        steps = [index - area] if index >= area else []
+        if index + area < len(mask):
+            steps.append(index + area)
+        steps = [step for step in steps if data[index] in self.stairs and data[step] in self.stairs]
+
+        if x > 0:
+            steps.append(index - 1)
+        if x < width - 1:
+            steps.append(index + 1)
+        if index - width >= layer * area:
+            steps.append(index - width)
+        if index + width < (layer + 1) * area:
+            steps.append(index + width)
+        return [step for step in steps if mask[step]]
+
+    def neighbours(self, index):
+        """
+        Gets the walkable tiles one step away from a tile, including through portals
+
+        :param index: int: Index of the tile
+        :return: [int]: Walkable indexes
+        """
+
+        mask = self.navigation()
+        return self.adjacent(index) + [step for step in self.portals.get(index, ()) if mask[step]]
+
+    def heuristic(self, index, goal):
+        """
+        Estimates the steps between two tiles. Portals can skip any distance, so there is no estimate with portals
+
+        :param index: int: Index of the tile
+        :param goal: int: Index of the goal
+        :return: int: Estimated steps
+        """
+
+        if self.portals:
+            return 0
+        width, area = self.section_obj.section_width, self.section_obj.section_width * self.section_obj.section_height
+        (layer, rem), (goal_layer, goal_rem) = divmod(index, area), divmod(goal, area)
+        (y, x), (goal_y, goal_x) = divmod(rem, width), divmod(goal_rem, width)
+        return abs(x - goal_x) + abs(y - goal_y) + abs(layer - goal_layer)
+
+    def find_path(self, start, goal):
+        """
+        Finds a shortest path with A*
+
+        :param start: int: Index to start from
+        :param goal: int: Index to reach
+        :return: [int] or None: Indexes from start to goal inclusive, None if goal cannot be reached
+        """
+
+        mask = self.navigation()
+        if not (mask[start] and mask[goal]):
+            return None
+
+        came_from = {start: None}
+        cost = {start: 0}
+        heap = [(self.heuristic(start, goal), 0, start)]
+        while heap:
+            _, steps, index = heapq.heappop(heap)
+            if index == goal:
+                path = []
+                while index is not None:
+                    path.append(index)
+                    index = came_from[index]
+                return path[::-1]
+            if steps > cost[index]:  # Stale heap entry
+                continue
+            for step in self.neighbours(index):
+                if steps + 1 < cost.get(step, steps + 2):
+                    cost[step], came_from[step] = steps + 1, index
+                    heapq.heappush(heap, (steps + 1 + self.heuristic(step, goal), steps + 1, step))
+
+        logger.debug(f"No path from {start} to {goal}")
+        return None
+
+    def flow_field(self, target):
+        """
+        Gets the steps from every tile to a target, from one reverse search out of the target.
+        Every step costs the same, so the Dijkstra search is breadth first
+
+        :param target: int: Index agents move to
+        :return: array: Steps to target for each index of the section data, -1 if the target cannot be reached
+        """
+
+        if target in self.flow_fields:
+            self.flow_fields.move_to_end(target)
+            return self.flow_fields[target]
+
+        logger.debug(f"Building flow field to {target}")
+        mask = self.navigation()
+        distances = array("l", [-1]) * len(mask)
+        if mask[target]:
+            entrances = {}  # Portals are walked backwards, from where they lead to where they are entered
+            for start, ends in self.portals.items():
+                for end in ends:
+                    entrances.setdefault(end, []).append(start)
+
+            distances[target] = 0
+            queue = deque([target])
+            while queue:
+                index = queue.popleft()
+                for step in self.adjacent(index) + entrances.get(index, []):
+                    if distances[step] < 0 and mask[step]:
+                        distances[step] = distances[index] + 1
+                        queue.append(step)
+
+        self.flow_fields[target] = distances
+        while len(self.flow_fields) > self.variables["Flow Fields"]:
+            self.flow_fields.popitem(last=False)
+        return distances
+
+    def move_agents(self, agents, target):
+        """
+        Moves many agents one step towards the same target
+
+        :param agents: [int]: Index of each agent
+        :param target: int: Index every agent moves to
+        :return: [int]: Next index of each agent. Agents that cannot reach the target stay where they are
+        """
+
+        distances = self.flow_field(target)
+        moves = []
+        for agent in agents:
+            if distances[agent] <= 0:
+                moves.append(agent)
+                continue
+            moves.append(min((step for step in self.neighbours(agent) if 0 <= distances[step] < distances[agent]),
+                             key=distances.__getitem__, default=agent))
+        return moves
+
+
+Pathfinder.load_variables()
+Config("Pathfinding").subscribe(Pathfinder.load_variables)
+Config("Section").subscribe(Pathfinder.load_variables)
@@ -0,0 +1,235 @@
+import logging
+import weakref
+from array import array
+import Pathfinding
+from Code.Imports.ConfigMaster import Config
+
+logger = logging.getLogger(__name__)
+
+
+class Regions:
+    """
+    Index of the connected walkable regions of a section object.
+
+    Walkable tiles (see Pathfinding) that touch within a layer share a region, labelled with union-find. Painting a tile
+    walkable joins it to its neighbours straight away. Painting a tile unwalkable can split a region, so only that
+    layer is relabelled, on the next query. A region id is the index of one of its tiles and stays valid until the
+    section is painted again.
+    """
+
+    instances = weakref.WeakSet()  # Live indexes, to drop them when the walkable tile types change
+
+    def __init__(self, section_obj):
+        """
+        Initialises a region index for a section object
+
+        :param section_obj: Section.Section: The section object to index
+        """
+
+        self.section_obj = section_obj
+        self.parent = None  # Index > parent index, -1 for unwalkable tiles. Built on first use
+        self.size = None  # Root index > tiles in region
+        self.dirty = set()  # Layers to relabel before the next query
+        self.borders = None  # Region > border tiles, built on first use
+        self.listener = section_obj.subscribe_method(self.invalidate)  # Dropped with the index
+        self.instances.add(self)
+
+    def close(self):
+        """
+        Stops following paints of the section object
+        """
+
+        if self.listener is not None:
+            self.section_obj.unsubscribe(self.listener)
+            self.listener = None
+
+    @classmethod
+    def drop_all(cls, variables=None):
+        """
+        Drops every index, for when the walkable tile types change
+
+        :param variables: dict: Updated config, unused
+        """
+
+        for regions in list(cls.instances):
+            regions.invalidate(None)
+
+    def invalidate(self, indices):
+        """
+        Section listener, updates regions for painted tiles
+
+        :param indices: [int]: Painted indexes, or None when the section was resized
+        """
+
+        if self.parent is None:
+            return
+        self.borders = None
+        if indices is None:
+            logger.debug("Section resized, dropping region index")
+            self.parent = None
+            return
+
+        area = self.section_obj.section_width * self.section_obj.section_height
+        for index in indices:
+            walkable = self.section_obj.data[index] in Pathfinding.Pathfinder.walkable
+            if walkable and self.parent[index] < 0:  # Joins neighbouring regions
+                self.parent[index], self.size[index] = index, 1
+                for step in self.adjacent(index):
+                    self.union(index, step)
+            elif not walkable and self.parent[index] >= 0:  # May split its region
+                self.dirty.add(index // area)
+
+    def adjacent(self, index):
+        """
+        Gets the walkable tiles next to a tile within its layer
+
+        :param index: int: Index of the tile
+        :return: [int]: Walkable indexes
+        """
+
+        width, area = self.section_obj.section_width, self.section_obj.section_width * self.section_obj.section_height
+        x, start = index % width, index - index % area
+        steps = []
+        if x > 0:
+            steps.append(index - 1)
+        if x < width - 1:
+            steps.append(index + 1)
+        if index - width >= start:
+            steps.append(index - width)
+        if index + width < start + area:
+            steps.append(index + width)
+        return [step for step in steps if self.parent[step] >= 0]
+
+    def find(self, index):
+        """
+        Finds the region of a tile, halving the path on the way
+
+        :param index: int: Index of the tile
+        :return: int: Region id, -1 for unwalkable tiles
+        """
+
+        parent = self.parent
+        if parent[index] < 0:
+            return -1
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def union(self, a, b):
+        """
+        Joins the regions of two walkable tiles, the smaller under the larger
+
+        :param a: int: Index of the first tile
+        :param b: int: Index of the second tile
+        """
+
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+
+    def label(self, layer):
+        """
+        Labels every region of a layer from scratch
+
+        :param layer: int: The layer to label
+        """
+
+        data, width, walkable_types = self.section_obj.data, self.section_obj.section_width, \
+            Pathfinding.Pathfinder.walkable
+        area = width * self.section_obj.section_height
+        for index in range(layer * area, (layer + 1) * area):
+            walkable = data[index] in walkable_types
+            self.parent[index], self.size[index] = (index, 1) if walkable else (-1, 0)
+            if walkable:
+                if index % width:  # Left
+                    if self.parent[index - 1] >= 0:
+                        self.union(index, index - 1)
+                if index - width >= layer * area:  # Up
+                    if self.parent[index - width] >= 0:
+                        self.union(index, index - width)
+
+    def refresh(self):
+        """
+        Builds the index, or relabels layers that may have split, before a query
+        """
+
+        if self.parent is None:
+            logger.debug("Building region index")
+            size = len(self.section_obj.data)
+            self.parent, self.size = array("l", [-1]) * size, array("l", [0]) * size
+            self.dirty = set(range(self.section_obj.section_depth))
+        for layer in sorted(self.dirty):
+            self.label(layer)
+        self.dirty.clear()
+
+    def region(self, index):
+        """
+        Gets the region of a tile
+
+        :param index: int: Index of the tile
+        :return: int: Region id, -1 for unwalkable tiles
+        """
+
+        self.refresh()
+        return self.find(index)
+
+    def same_region(self, a, b):
+        """
+        Checks if two tiles are walkable and connected
+
+        :param a: int: Index of the first tile
+        :param b: int: Index of the second tile
+        :return: bool
+        """
+
+        region = self.region(a)
+        return region >= 0 and region == self.find(b)
+
+    def region_size(self, region):
+        """
+        Gets the amount of tiles in a region
+
+        :param region: int: Region id
+        :return: int
+        """
+
+        region = self.region(region)
+        return self.size[region] if region >= 0 else 0
+
+    def regions(self):
+        """
+        Gets every region id
+
+        :return: [int]
+        """
+
+        self.refresh()
+        return [index for index, parent in enumerate(self.parent) if parent == index]
+
+    def border_tiles(self, region):
+        """
+        Gets the tiles of a region next to an unwalkable tile or the edge of the section
+
+        :param region: int: Region id
+        :return: [int]
+        """
+
+        region = self.region(region)
+        if region < 0:
+            return []
+        if self.borders is None:
+            self.borders = {}
+            for index in range(len(self.parent)):
+                if self.parent[index] >= 0 and len(self.adjacent(index)) < 4:
+                    self.borders.setdefault(self.find(index), []).append(index)
+        return self.borders.get(region, [])
+
+
+# Registered after Pathfinding's own subscriptions, so the new walkable types are already set
+Config("Pathfinding", Pathfinding.__file__).subscribe(Regions.drop_all)
+Config("Section", Pathfinding.__file__).subscribe(Regions.drop_all)
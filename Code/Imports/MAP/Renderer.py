@@ -0,0 +1,172 @@
+import tkinter as tk
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Tile_Canvas:
+    """
+    Draws the current layer of a section object onto a single canvas.
+
+    Only the tiles inside the visible part of the canvas are drawn, and they are redrawn when the view scrolls, zooms
+    or resizes. Scroll with the mouse wheel (shift for sideways), zoom with control and the mouse wheel. Clicking or
+    dragging over tiles passes their position within the layer to on_click.
+    """
+
+    def __init__(self, frame, section_obj, variables, inverse, on_click):
+        """
+        Initialises a canvas inside a given frame
+
+        :param frame: tk.Frame: Frame to place the canvas and scrollbars in
+        :param section_obj: Section.Section: The section object to draw
+        :param variables: dict: Interactive config
+        :param inverse: [str]: Text colour of each tile colour, read on every draw
+        :param on_click: callable: Takes the position within the current layer of a clicked tile
+        """
+
+        self.section_obj = section_obj
+        self.variables = variables
+        self.inverse = inverse
+        self.on_click = on_click
+        self.tile_size = variables["Tile Size"]
+        self.items = {}  # Position > (rectangle, text or None) of every drawn tile
+        self.view = None  # (first column, last column, first row, last row) drawn
+        self.pending = None  # Scheduled redraw
+        self.last_click = None  # Last tile painted by a drag
+
+        self.frame = tk.Frame(frame)
+        self.canvas = tk.Canvas(self.frame, bg=frame.cget("bg"), highlightthickness=0)
+        x_bar = tk.Scrollbar(self.frame, orient="horizontal", command=self.canvas.xview)
+        y_bar = tk.Scrollbar(self.frame, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(xscrollcommand=lambda *args: (x_bar.set(*args), self.schedule()),
+                              yscrollcommand=lambda *args: (y_bar.set(*args), self.schedule()))
+        x_bar.pack(side="bottom", fill="x")
+        y_bar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        # Bindings
+        self.canvas.bind("<Configure>", lambda event: self.schedule())
+        self.canvas.bind("<Button-1>", self.click)
+        self.canvas.bind("<B1-Motion>", self.click)
+        self.canvas.bind("<ButtonRelease-1>", lambda event: setattr(self, "last_click", None))
+        self.canvas.bind("<MouseWheel>", lambda event: self.scroll(event, -1 if event.delta > 0 else 1))
+        self.canvas.bind("<Button-4>", lambda event: self.scroll(event, -1))  # Linux wheel
+        self.canvas.bind("<Button-5>", lambda event: self.scroll(event, 1))
+
+        self.resize()
+
+    def resize(self):
+        """
+        Updates the scroll region to the size of the section at the current zoom
+        """
+
+        self.canvas.configure(scrollregion=(0, 0, self.section_obj.section_width * self.tile_size,
+                                            self.section_obj.section_height * self.tile_size))
+        self.redraw()
+
+    def scroll(self, event, amount):
+        """
+        Scrolls or zooms the canvas with the mouse wheel
+
+        :param event: tk.Event: Wheel event
+        :param amount: int: Units to scroll, negative is up/left
+        """
+
+        if event.state & 0x0004:  # Control, zoom around the top left of the view
+            size = min(max(self.tile_size - amount * 2, self.variables["Min Tile Size"]),
+                       self.variables["Max Tile Size"])
+            if size != self.tile_size:
+                x, y = self.canvas.canvasx(0) / self.tile_size, self.canvas.canvasy(0) / self.tile_size
+                self.tile_size = size
+                self.resize()
+                self.canvas.xview_moveto(x / max(1, self.section_obj.section_width))
+                self.canvas.yview_moveto(y / max(1, self.section_obj.section_height))
+        elif event.state & 0x0001:  # Shift
+            self.canvas.xview_scroll(amount, "units")
+        else:
+            self.canvas.yview_scroll(amount, "units")
+
+    def tile_at(self, x, y):
+        """
+        Finds the tile under a point of the canvas widget
+
+        :param x: int: Widget x coordinate
+        :param y: int: Widget y coordinate
+        :return: int or None: Position within the current layer, None outside the section
+        """
+
+        col, row = int(self.canvas.canvasx(x) // self.tile_size), int(self.canvas.canvasy(y) // self.tile_size)
+        if 0 <= col < self.section_obj.section_width and 0 <= row < self.section_obj.section_height:
+            return row * self.section_obj.section_width + col
+        return None
+
+    def click(self, event):
+        """
+        Passes a clicked or dragged over tile to on_click, once per tile during a drag
+
+        :param event: tk.Event: Mouse event
+        """
+
+        pos = self.tile_at(event.x, event.y)
+        if pos is not None and pos != self.last_click:
+            self.last_click = pos
+            self.on_click(pos)
+
+    def schedule(self):
+        """
+        Schedules a draw once Tk is idle, so a burst of scroll events draws once
+        """
+
+        if self.pending is None:
+            self.pending = self.canvas.after_idle(self.draw)
+
+    def redraw(self):
+        """
+        Forgets what is drawn and draws the visible tiles again, for when the layer or zoom changed
+        """
+
+        self.view = None
+        self.schedule()
+
+    def draw(self):
+        """
+        Draws the tiles inside the visible part of the canvas
+        """
+
+        self.pending = None
+        width, height, size = self.section_obj.section_width, self.section_obj.section_height, self.tile_size
+        left, top = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        view = (max(0, int(left // size)), min(width, int((left + self.canvas.winfo_width()) // size) + 1),
+                max(0, int(top // size)), min(height, int((top + self.canvas.winfo_height()) // size) + 1))
+        if view == self.view:
+            return
+
+        logger.debug(f"Drawing columns {view[0]}-{view[1]}, rows {view[2]}-{view[3]}")
+        self.canvas.delete("tile")
+        self.items, self.view = {}, view
+        section, colours, inverse = self.section_obj.section, self.variables["Tile Colour"], self.inverse
+        for row in range(view[2], view[3]):
+            for col in range(view[0], view[1]):
+                pos = row * width + col
+                if pos >= len(section):
+                    break
+                val = section[pos]
+                rectangle = self.canvas.create_rectangle(col * size, row * size, (col + 1) * size, (row + 1) * size,
+                                                         fill=colours[val], outline="", tags="tile")
+                text = self.canvas.create_text((col + 0.5) * size, (row + 0.5) * size, text=val, fill=inverse[val],
+                                               tags="tile") if size >= 16 else None
+                self.items[pos] = (rectangle, text)
+
+    def refresh_tile(self, pos):
+        """
+        Recolours a drawn tile to match the section object
+
+        :param pos: int: Position of the tile within the current layer
+        """
+
+        if pos in self.items:
+            val = self.section_obj.section[pos]
+            rectangle, text = self.items[pos]
+            self.canvas.itemconfigure(rectangle, fill=self.variables["Tile Colour"][val])
+            if text is not None:
+                self.canvas.itemconfigure(text, text=val, fill=self.inverse[val])
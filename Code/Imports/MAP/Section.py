@@ -1,5 +1,11 @@
 import logging
 import math
+import mmap as memory_map
+import os
+import struct
+import weakref
+import zlib
+from array import array
 from Code.Imports.ConfigMaster import Config
 
 
@@ -12,25 +18,34 @@ class Section:
     """
 
     variables = Config("Section").data
+    TYPECODE = "B"  # One unsigned byte per tile
+
+    # Section file layout: header, name, tile type table, layer table (compressed only), tile bytes
+    MAGIC, VERSION = b"SECT", 1
+    HEADER = struct.Struct("<4sBBIII")  # Magic, version, compressed, width, height, depth
+    LENGTH = struct.Struct("<I")
 
     # Initialisation
     section_name = ""
     section_height, section_width, section_depth = (0, 0, 1)
     current_layer = 0
-    data, section = [], []
+    data, section = array(TYPECODE), memoryview(array(TYPECODE))
+    mapping = None  # Memory map data is a view of, see load
+    mapped = {}  # Section file > sections memory mapped from it
 
     def __init__(self, name=None, data=None, width=variables["Default Width"], height=variables["Default Height"]):
         """
         Initialises section object
 
         :param name: str: Name of section
-        :param data: [int]: The full section data. Default None
+        :param data: [int]: The full section data, stored as a typed byte buffer. Default None
         :param width: int: The scope width
         :param height: int: The scope height
         """
 
         self.section_name = name  # Set name
-        self.data = data if data is not None else [0 for _ in range(width * height)]  # Set data
+        self.listeners = []  # Called with changed indexes, or None when the layout changed
+        self.data = array(self.TYPECODE, data if data is not None else bytes(width * height))  # Set data
         self.change_scope(height=height, width=width)  # Set scope
 
     def change_scope(self, height=None, width=None, layer=None):
@@ -52,39 +67,117 @@ class Section:
         # New area
         new_area = height * width
 
-        # Update dimensions
-        if height != self.section_height or width != self.section_width:
-            if width > self.section_width and self.section_width:  # Width increase
-                logging.info(f"Increasing width by {width - self.section_width} ({self.section_width}>{width})")
-                self.data = [item for sublist in
-                             [self.data[pos:pos + self.section_width] + [0 for _ in range(width - self.section_width)]
-                              for pos in range(0, len(self.data), self.section_width)] for item in sublist]
-            elif width < self.section_width and self.section_width:  # Width decrease
-                logging.info(f"Decreasing width by {self.section_width - width} ({self.section_width}>{width})")
-                self.data = [item for sublist in [self.data[pos:pos + width] for pos in
-                                                  range(0, len(self.data), self.section_width)] for item in sublist]
-            elif height > self.section_height and self.section_height:  # Height increase
-                logging.info(f"Increasing height by {height - self.section_height} ({self.section_height}>{height})")
-                self.data = [item for sublist in
-                             [self.data[pos:pos + (self.section_width * self.section_height)] +
-                              [0 for _ in range(self.section_width * (height - self.section_height))] for pos in
-                              range(0, len(self.data), self.section_width * self.section_height)] for item in sublist]
-            elif height < self.section_height and self.section_height:  # Height decrease
-                logging.info(f"Decreasing height by {self.section_height - height} ({self.section_height}>{height})")
-                self.data = [item for sublist in [self.data[pos:pos + new_area] for pos in
-                                                  range(0, len(self.data), self.section_width * self.section_height)]
-                             for item in sublist]
+        # Update dimensions (width and height together, in one crop/pad pass)
+        resized = height != self.section_height or width != self.section_width
+        if resized and self.section_width:
+            logging.info(f"Resizing {self.section_width}x{self.section_height} > {width}x{height}")
+            self.data = self.resize_grid(height, width)
 
         # Update section components
         self.section_height, self.section_width, self.section_depth = height, width, max(1, math.ceil(
             len(self.data) / (height * width)))
 
-        # Pad/Truncate
-        self.data = self.data[:new_area * self.section_depth] + [0] * max(0, new_area * self.section_depth - len(
-            self.data))
+        # Pad/Truncate (only when the buffer is not already whole layers)
+        if len(self.data) != new_area * self.section_depth:
+            self.data, resized = self.resize_buffer(new_area * self.section_depth), True
+
+        # Update section (view of the current layer, no copy)
+        self.section, self.current_layer = memoryview(self.data)[new_area * layer: new_area * (layer + 1)], layer
+
+        if resized:
+            self.notify(None)
+
+    def subscribe(self, listener):
+        """
+        Adds a listener that is called whenever tiles change
+
+        :param listener: callable: Takes a list of changed indexes, or None when the section was resized
+        """
+
+        self.listeners.append(listener)
+
+    def subscribe_method(self, method):
+        """
+        Adds a bound method as a listener without keeping its object alive. The listener removes itself once the
+        object is discarded
+
+        :param method: callable: Bound method taking a list of changed indexes, or None when the section was resized
+        :return: callable: The listener added, to give to unsubscribe
+        """
+
+        reference = weakref.WeakMethod(method)
+
+        def listener(indices):
+            bound = reference()
+            if bound is None:
+                self.unsubscribe(listener)
+            else:
+                bound(indices)
+
+        self.subscribe(listener)
+        return listener
 
-        # Update section
-        self.section, self.current_layer = self.data[new_area * layer: new_area * (layer + 1)], layer
+    def unsubscribe(self, listener):
+        """
+        Removes a listener added with subscribe
+
+        :param listener: callable: The listener to remove
+        """
+
+        self.listeners.remove(listener)
+
+    def notify(self, indices):
+        """
+        Calls every listener with changed indexes
+
+        :param indices: [int]: Indexes of self.data that changed, or None when the section was resized
+        """
+
+        for listener in tuple(self.listeners):  # Listeners may unsubscribe while being called
+            listener(indices)
+
+    def resize_buffer(self, size):
+        """
+        Creates a new buffer of given size holding the start of self.data, zero padded or truncated
+
+        :param size: int: Amount of tiles in the new buffer
+        :return: array: The resized buffer
+        """
+
+        resized = array(self.TYPECODE, bytes(size))
+        keep = min(size, len(self.data))
+        with memoryview(resized) as target, memoryview(self.data) as source:
+            target[:keep] = source[:keep]
+        return resized
+
+    def resize_grid(self, height, width):
+        """
+        Creates a new buffer with every layer of self.data cropped or zero padded to height x width.
+        Treats self.data as a (depth, height, width) grid and copies the kept rows of each layer in one pass
+
+        :param height: int: New height
+        :param width: int: New width
+        :return: array: The resized buffer
+        """
+
+        old_area, new_area = self.section_height * self.section_width, height * width
+        depth = math.ceil(len(self.data) / old_area)
+        rows, keep = min(height, self.section_height), min(width, self.section_width)
+        resized = array(self.TYPECODE, bytes(depth * new_area))
+
+        with memoryview(resized) as target, memoryview(self.data) as source:
+            if width == self.section_width:  # Rows are unchanged, copy the kept rows of each layer in one slice
+                for layer in range(depth):
+                    block = source[layer * old_area: layer * old_area + rows * width]
+                    target[layer * new_area: layer * new_area + len(block)] = block
+            else:
+                for layer in range(depth):
+                    for row in range(rows):
+                        start = layer * old_area + row * self.section_width
+                        line = source[start: start + keep]
+                        start = layer * new_area + row * width
+                        target[start: start + len(line)] = line
+        return resized
 
     def edit_layers(self, amount):
         """
@@ -97,13 +190,12 @@ class Section:
             logging.info(
                 f"{'Increasing' if amount > 0 else 'Decreasing'} layers by {abs(amount)} ({self.section_depth}>{self.section_depth + amount})")
             area = self.section_height * self.section_width
-            if amount > 0:  # Increase layers
-                self.data += [0 for _ in range(area * amount)]
-            else:  # Decrease layers
-                self.data = self.data[:len(self.data) + (area * amount)]
+            # Increase layers (zero padded) or decrease layers (truncated)
+            self.data = self.resize_buffer(len(self.data) + (area * amount))
 
             # Update
             self.change_scope()
+            self.notify(None)
 
     def paint_tile(self, index, val):
         """
@@ -114,7 +206,186 @@ class Section:
         """
 
         logging.info(f"Changing index {index} to {val} ({self.data[index]}>{val})")
-        # Change Value
+        # Change Value (self.section is a view of self.data, so no update is needed)
         self.data[index] = val
-        # Update
-        self.change_scope()
+        self.notify([index])
+
+    def paint_tiles(self, indices, val):
+        """
+        "Paints" every index within self.data to the paint value
+
+        :param indices: [int]: Indexes of self.data to change
+        :param val: int: Value to change into
+        """
+
+        data, indices = self.data, list(indices)
+        for index in indices:
+            data[index] = val
+        logging.info(f"Changed {len(indices)} tiles to {val}")
+        self.notify(indices)
+
+    def fill_rect(self, layer, x0, y0, x1, y1, val):
+        """
+        "Paints" a rectangle of a layer to the paint value. Bounds are clamped to the section
+
+        :param layer: int: Layer to paint on
+        :param x0: int: First column (inclusive)
+        :param y0: int: First row (inclusive)
+        :param x1: int: Last column (exclusive)
+        :param y1: int: Last row (exclusive)
+        :param val: int: Value to change into
+        """
+
+        x0, x1 = max(0, x0), min(self.section_width, x1)
+        y0, y1 = max(0, y0), min(self.section_height, y1)
+        if x0 >= x1 or y0 >= y1 or not 0 <= layer < self.section_depth:
+            return
+
+        logging.info(f"Filling layer {layer} ({x0}, {y0})>({x1}, {y1}) with {val}")
+        row = array(self.TYPECODE, [val]) * (x1 - x0)
+        start = layer * self.section_height * self.section_width
+        with memoryview(self.data) as target:
+            for y in range(y0, y1):
+                pos = start + y * self.section_width
+                target[pos + x0: pos + x1] = row
+
+        if self.listeners:
+            self.notify([start + y * self.section_width + x for y in range(y0, y1) for x in range(x0, x1)])
+
+    def save(self, path, compress=False):
+        """
+        Saves the section to a binary section file
+
+        :param path: str: File to save to
+        :param compress: bool: zlib compress each layer. Compressed files cannot be memory mapped on load
+        """
+
+        logging.info(f"Saving section {self.section_name} to {path}")
+        # Write to a temporary file first, the section may be memory mapped from path
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                self.write_file(file, compress)
+
+            # A mapped file cannot be replaced on every platform, so sections mapped from it read their data in first
+            for section in list(self.mapped.get(os.path.abspath(path), ())):
+                section.detach()
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def write_file(self, file, compress=False):
+        """
+        Writes the section file layout to an open file. Views of the data only live while this runs, so a memory map
+        behind them can be closed afterwards
+
+        :param file: Binary file to write to
+        :param compress: bool: zlib compress each layer
+        """
+
+        area = self.section_height * self.section_width
+        name = (self.section_name or "").encode("utf-8")
+        table = [tile.encode("utf-8") for tile in self.variables["Tile Type"]]
+
+        with memoryview(self.data) as source:
+            layers = [source[area * layer: area * (layer + 1)] for layer in range(self.section_depth)]
+            if compress:
+                layers = [zlib.compress(layer) for layer in layers]
+
+            file.write(self.HEADER.pack(self.MAGIC, self.VERSION, compress, self.section_width, self.section_height,
+                                        self.section_depth))
+            file.write(self.LENGTH.pack(len(name)) + name)
+            file.write(bytes([len(table)]) + b"".join(bytes([len(tile)]) + tile for tile in table))
+            if compress:
+                file.write(b"".join(self.LENGTH.pack(len(layer)) for layer in layers))
+            for layer in layers:
+                file.write(layer)
+
+    def detach(self):
+        """
+        Copies memory mapped data into an array and closes the memory map, leaving the section file free to be
+        replaced or removed
+        """
+
+        if self.mapping is None:
+            return
+        logging.info(f"Detaching section {self.section_name} from its section file")
+        old_data, old_section = self.data, self.section
+        if isinstance(old_data, memoryview):
+            self.data = array(self.TYPECODE, old_data)
+            self.change_scope()
+            old_section.release()
+            old_data.release()
+        try:
+            self.mapping.close()
+        except BufferError:  # Still viewed elsewhere, closed once those views are gone
+            logging.warning(f"Section {self.section_name} data is still in use, its memory map stays open")
+        for sections in self.mapped.values():
+            sections.discard(self)
+        self.mapping = None
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Loads a section from a binary section file
+
+        :param path: str: File to load from
+        :param mmap: bool: Memory map uncompressed tile data instead of reading it, so layers are only read from
+                     disk when touched. Painting never writes back to the file. The data of a mapped section is a
+                     writable memoryview of the map rather than an array, indexed, sliced and copied the same way,
+                     and becomes an array when the section is resized or detached
+        :return: Section: The loaded section
+        """
+
+        logging.info(f"Loading section from {path}")
+        with open(path, "rb") as file:
+            if mmap:
+                mapping = memory_map.mmap(file.fileno(), 0, access=memory_map.ACCESS_COPY)
+                raw = memoryview(mapping)
+            else:
+                mapping, raw = None, memoryview(file.read())
+
+        magic, version, compressed, width, height, depth = cls.HEADER.unpack_from(raw)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"{path} is not a version {cls.VERSION} section file")
+        offset = cls.HEADER.size
+
+        # Name
+        (length,), offset = cls.LENGTH.unpack_from(raw, offset), offset + cls.LENGTH.size
+        name, offset = bytes(raw[offset: offset + length]).decode("utf-8") or None, offset + length
+
+        # Tile type table
+        table, offset = [], offset + 1
+        for _ in range(raw[offset - 1]):
+            length = raw[offset]
+            table.append(bytes(raw[offset + 1: offset + 1 + length]).decode("utf-8"))
+            offset += 1 + length
+        if table != cls.variables["Tile Type"]:
+            logging.warning(f"Tile types of {path} {table} differ from config {cls.variables['Tile Type']}")
+
+        # Tile data
+        area = width * height
+        if compressed:
+            lengths = [cls.LENGTH.unpack_from(raw, offset + cls.LENGTH.size * layer)[0] for layer in range(depth)]
+            offset += cls.LENGTH.size * depth
+            data = array(cls.TYPECODE)
+            for length in lengths:
+                data.frombytes(zlib.decompress(raw[offset: offset + length]))
+                offset += length
+        elif mmap:
+            data = raw[offset: offset + area * depth]
+        else:
+            data = array(cls.TYPECODE, raw[offset: offset + area * depth])
+        raw.release()
+
+        section = cls(name=name, width=width, height=height)
+        section.data = data
+        section.change_scope()
+        if isinstance(data, memoryview):
+            section.mapping = mapping
+            cls.mapped.setdefault(os.path.abspath(path), weakref.WeakSet()).add(section)
+        elif mapping is not None:
+            mapping.close()
+        return section
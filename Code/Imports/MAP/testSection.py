@@ -1,7 +1,16 @@
 import unittest
 import Section
+import Region
+import Map
+import Pathfinding
+import Interactive
+from Code.Imports.ConfigMaster import Config
 import random
 import string
+import gc
+import os
+import tempfile
+import weakref
 
 
 class SectionTestCase(unittest.TestCase):
@@ -137,37 +146,52 @@ class SectionTestCase(unittest.TestCase):
 
         # Test adding width
         test_section.change_scope(width=default["Width"] + 1, height=default["Height"])
-        self.assertEqual(test_section.data, default["Data+W"], msg="Section data not as expected after adding width.")
+        self.assertEqual(list(test_section.data), default["Data+W"], msg="Section data not as expected after adding width.")
         test_section.change_scope(width=default["Width"], height=default["Height"])
         test_section.change_scope(width=default["Width"] + 2, height=default["Height"])
-        self.assertEqual(test_section.data, default["Data+W2"], msg="Section data not as expected after adding width.")
+        self.assertEqual(list(test_section.data), default["Data+W2"], msg="Section data not as expected after adding width.")
         test_section.change_scope(width=default["Width"], height=default["Height"])
 
 
         # Test adding height
         test_section.change_scope(width=default["Width"], height=default["Height"] + 1)
-        self.assertEqual(test_section.data, default["Data+H"], msg="Section data not as expected after adding height.")
+        self.assertEqual(list(test_section.data), default["Data+H"], msg="Section data not as expected after adding height.")
         test_section.change_scope(width=default["Width"], height=default["Height"])
         test_section.change_scope(width=default["Width"], height=default["Height"] + 2)
-        self.assertEqual(test_section.data, default["Data+H2"], msg="Section data not as expected after adding height.")
+        self.assertEqual(list(test_section.data), default["Data+H2"], msg="Section data not as expected after adding height.")
         test_section.change_scope(width=default["Width"], height=default["Height"])
 
         # Test subtracting width
         test_section.change_scope(width=default["Width"] - 1, height=default["Height"])
-        self.assertEqual(test_section.data, default["Data-W"], msg="Section data not as expected after subtracting width.")
+        self.assertEqual(list(test_section.data), default["Data-W"], msg="Section data not as expected after subtracting width.")
         test_section = Section.Section(width=default["Width"], height=default["Height"], data=default["Data"])
         test_section.change_scope(width=default["Width"] - 2, height=default["Height"])
-        self.assertEqual(test_section.data, default["Data-W2"], msg="Section data not as expected after subtracting width.")
+        self.assertEqual(list(test_section.data), default["Data-W2"], msg="Section data not as expected after subtracting width.")
         test_section = Section.Section(width=default["Width"], height=default["Height"], data=default["Data"])
 
         # Test subtracting height
         test_section.change_scope(width=default["Width"], height=default["Height"] - 1)
-        self.assertEqual(test_section.data, default["Data-H"], msg="Section data not as expected after subtracting height.")
+        self.assertEqual(list(test_section.data), default["Data-H"], msg="Section data not as expected after subtracting height.")
         test_section = Section.Section(width=default["Width"], height=default["Height"], data=default["Data"])
         test_section.change_scope(width=default["Width"], height=default["Height"] - 2)
-        self.assertEqual(test_section.data, default["Data-H2"], msg="Section data not as expected after subtracting height.")
+        self.assertEqual(list(test_section.data), default["Data-H2"], msg="Section data not as expected after subtracting height.")
 
 
+    def test_section_edit_both(self):
+        data = list(range(1, 13)) * 2  # 2 layers of 3x4
+        test_section = Section.Section(width=4, height=3, data=data)
+
+        # Grow width and shrink height in a single call
+        test_section.change_scope(width=5, height=2)
+        self.assertEqual(list(test_section.data), [1, 2, 3, 4, 0, 5, 6, 7, 8, 0] * 2,
+                         msg="Section data not as expected after changing width and height.")
+
+        # Shrink width and grow height in a single call
+        test_section.change_scope(width=2, height=4)
+        self.assertEqual(list(test_section.data), [1, 2, 5, 6, 0, 0, 0, 0] * 2,
+                         msg="Section data not as expected after changing width and height.")
+        self.assertEqual(test_section.section_depth, 2, msg="Section depth not as expected.")
+
     def test_section_layer_edit(self):
         default = {
             "Height": 4,
@@ -192,6 +216,240 @@ class SectionTestCase(unittest.TestCase):
         test_section.paint_tile(randomint, 2)
         self.assertEqual(test_section.data[randomint], 2)
 
+    def test_section_layer_view(self):
+        test_section = Section.Section(height=3, width=3, data=[1] * 9 + [2] * 9)
+
+        # Section is a view of the current layer
+        self.assertEqual(list(test_section.section), [1] * 9, msg="Section scope not as expected.")
+        test_section.change_scope(layer=1)
+        self.assertEqual(list(test_section.section), [2] * 9, msg="Section scope not as expected after layer change.")
+
+        # Writes to data are seen through the view without a rebuild
+        test_section.data[9] = 0
+        self.assertEqual(test_section.section[0], 0, msg="Section scope not sharing section data.")
+
+    def test_section_paint_bulk(self):
+        test_section = Section.Section(height=4, width=5)
+        test_section.edit_layers(1)
+
+        # Painting through paint_tiles
+        test_section.paint_tiles([0, 6, 19], 3)
+        self.assertEqual([test_section.data[i] for i in (0, 6, 19)], [3, 3, 3], msg="Painted tiles not as expected.")
+
+        # Filling a clamped rectangle on the second layer
+        test_section.change_scope(layer=1)
+        test_section.fill_rect(1, 3, 2, 9, 9, 2)
+        expected = [2 if row >= 2 and col >= 3 else 0 for row in range(4) for col in range(5)]
+        self.assertEqual(list(test_section.section), expected, msg="Filled layer not as expected.")
+        self.assertEqual(list(test_section.data[:20]), [3] + [0] * 5 + [3] + [0] * 12 + [3],
+                         msg="Fill changed another layer.")
+
+    def test_section_save_load(self):
+        test_section = Section.Section(name="Saved", height=4, width=6)
+        test_section.edit_layers(2)
+        test_section.paint_tiles(random.sample(range(4 * 6 * 3), 20), 3)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "saved.sct")
+            for compress, mmap in ((False, True), (False, False), (True, True)):
+                test_section.save(path, compress=compress)
+                loaded = Section.Section.load(path, mmap=mmap)
+                self.assertIsInstance(loaded.data, memoryview if mmap and not compress else Section.array,
+                                      msg="Loaded data type not as expected.")
+
+                self.assertEqual(loaded.section_name, "Saved", msg="Loaded name not as expected.")
+                self.assertEqual((loaded.section_width, loaded.section_height, loaded.section_depth), (6, 4, 3),
+                                 msg="Loaded dimensions not as expected.")
+                self.assertEqual(list(loaded.data), list(test_section.data), msg="Loaded data not as expected.")
+
+                # Loaded sections stay editable without touching the file
+                loaded.paint_tile(0, 2)
+                loaded.change_scope(layer=2)
+                self.assertEqual(list(loaded.section), list(test_section.data[48:]),
+                                 msg="Loaded layer not as expected.")
+                del loaded
+
+    def test_section_save_mapped(self):
+        test_section = Section.Section(name="Mapped", height=3, width=3, data=[1] * 9)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "mapped.sct")
+            test_section.save(path)
+            loaded = Section.Section.load(path)
+            loaded.paint_tile(4, 2)
+
+            # Saving over the mapped file detaches the loaded section, keeping its unsaved edits
+            test_section.save(path)
+            self.assertIsNone(loaded.mapping, msg="Mapped section not detached.")
+            self.assertIsInstance(loaded.data, Section.array, msg="Detached data not an array.")
+            self.assertEqual(list(loaded.section), [1] * 4 + [2] + [1] * 4, msg="Detached data not as expected.")
+
+            # A mapped section can be saved over its own file, closing its map
+            loaded = Section.Section.load(path)
+            loaded.paint_tile(0, 3)
+            with self.assertNoLogs(level="WARNING"):
+                loaded.save(path)
+            self.assertEqual(list(Section.Section.load(path, mmap=False).data), [3, 1, 1, 1, 1, 1, 1, 1, 1],
+                             msg="Section saved over its own file not as expected.")
+
+            # A failed save leaves the saved file and no temporary file behind
+            loaded = Section.Section.load(path)
+            loaded.section_name = "\ud800"  # Cannot be encoded
+            with self.assertRaises(UnicodeEncodeError):
+                loaded.save(path)
+            self.assertEqual(os.listdir(directory), ["mapped.sct"], msg="Temporary file left after a failed save.")
+            self.assertEqual(Section.Section.load(path, mmap=False).section_name, "Mapped",
+                             msg="Failed save changed the saved file.")
+            del loaded
+
+    def test_section_regions(self):
+        test_section = Section.Section(width=4, height=3, data=[1, 1, 0, 1,
+                                                                1, 0, 0, 1,
+                                                                1, 1, 0, 1])
+        regions = Region.Regions(test_section)
+
+        # Two regions split by the unwalkable column
+        self.assertTrue(regions.same_region(0, 9), msg="Connected tiles not in the same region.")
+        self.assertFalse(regions.same_region(0, 3), msg="Separate tiles in the same region.")
+        self.assertEqual(regions.region_size(0), 5, msg="Region size not as expected.")
+        self.assertEqual(sorted(regions.border_tiles(3)), [3, 7, 11], msg="Border tiles not as expected.")
+
+        # Painting a walkable tile joins the regions, painting an unwalkable one splits them again
+        test_section.paint_tile(2, 1)
+        self.assertTrue(regions.same_region(0, 11), msg="Regions not joined after painting.")
+        self.assertEqual(regions.region_size(11), 9, msg="Region size not as expected after joining.")
+        test_section.paint_tile(2, 0)
+        self.assertFalse(regions.same_region(0, 11), msg="Regions not split after painting.")
+        self.assertEqual(regions.region(2), -1, msg="Unwalkable tile in a region.")
+
+        # A discarded index is not kept alive by the section
+        discarded = weakref.ref(regions)
+        del regions
+        gc.collect()
+        self.assertIsNone(discarded(), msg="Discarded region index kept alive by its section.")
+        test_section.paint_tile(2, 1)
+        self.assertEqual(test_section.listeners, [], msg="Discarded region index still notified.")
+
+    def test_section_listeners(self):
+        test_section = Section.Section(width=3, height=3)
+        calls = []
+        test_section.subscribe(calls.append)
+
+        # Listeners get painted indexes, or None when the layout changes
+        test_section.paint_tile(4, 1)
+        test_section.paint_tiles([0, 8], 1)
+        test_section.change_scope(width=4)
+        test_section.unsubscribe(calls.append)
+        test_section.paint_tile(0, 2)
+        self.assertEqual(calls, [[4], [0, 8], None], msg="Listener calls not as expected.")
+
+    def test_pathfinding_paths(self):
+        test_section = Section.Section(width=4, height=3, data=[1, 1, 1, 1,
+                                                                0, 0, 0, 1,
+                                                                1, 1, 1, 1])
+        pathfinder = Pathfinding.Pathfinder(test_section)
+
+        # The wall forces the path around its open end
+        path = pathfinder.find_path(0, 8)
+        self.assertEqual(path, [0, 1, 2, 3, 7, 11, 10, 9, 8], msg="Path around wall not as expected.")
+
+        # Blocking the gap leaves the goal unreachable
+        test_section.paint_tile(7, 0)
+        self.assertIsNone(pathfinder.find_path(0, 8), msg="Path found to an unreachable goal.")
+        self.assertIsNone(pathfinder.find_path(0, 5), msg="Path found to an unwalkable goal.")
+
+        # Portals join the halves again
+        pathfinder.add_portal(0, 8)
+        self.assertEqual(pathfinder.find_path(1, 9), [1, 0, 8, 9], msg="Path through portal not as expected.")
+
+    def test_pathfinding_flow_field(self):
+        test_section = Section.Section(width=4, height=3, data=[1, 1, 1, 1,
+                                                                0, 0, 0, 1,
+                                                                1, 1, 1, 1])
+        pathfinder = Pathfinding.Pathfinder(test_section)
+
+        distances = pathfinder.flow_field(8)
+        self.assertEqual(list(distances), [8, 7, 6, 5, -1, -1, -1, 4, 0, 1, 2, 3], msg="Flow field not as expected.")
+        self.assertEqual(pathfinder.move_agents([0, 11, 4], 8), [1, 10, 4], msg="Agent moves not as expected.")
+
+        # Painting opens a shortcut and the flow field follows it
+        test_section.paint_tiles([4], 1)
+        distances = pathfinder.flow_field(8)
+        self.assertEqual(list(distances), [2, 3, 4, 5, 1, -1, -1, 4, 0, 1, 2, 3],
+                         msg="Flow field not updated after painting.")
+        self.assertEqual(pathfinder.move_agents([0], 8), [4], msg="Agent not moved through the shortcut.")
+
+    def test_pathfinding_listener(self):
+        test_section = Section.Section(width=3, height=3, data=[1] * 9)
+        pathfinder = Pathfinding.Pathfinder(test_section)
+        pathfinder.find_path(0, 8)
+        discarded = weakref.ref(pathfinder)
+
+        # A discarded pathfinder is not kept alive by the section and stops being notified
+        del pathfinder
+        gc.collect()
+        self.assertIsNone(discarded(), msg="Discarded pathfinder kept alive by its section.")
+        test_section.paint_tile(4, 0)
+        self.assertEqual(test_section.listeners, [], msg="Discarded pathfinder still notified.")
+
+        # A closed pathfinder stops following paints
+        pathfinder = Pathfinding.Pathfinder(test_section)
+        pathfinder.close()
+        pathfinder.close()
+        self.assertEqual(test_section.listeners, [], msg="Closed pathfinder still subscribed.")
+
+    def test_config_reload_unchanged(self):
+        calls = []
+        Config("Interactive").subscribe(calls.append)
+
+        # Derived values are kept out of the config, so an unchanged file reloads without callbacks
+        Config.reload_config(Config("Interactive").config_path)
+        self.assertEqual(calls, [], msg="Unchanged config reported as changed.")
+        self.assertEqual(len(Interactive.Section_GUI.inverse_tile), len(Interactive.Section_GUI.variables["Tile Colour"]),
+                         msg="Inverse tile colours not derived.")
+
+    def test_map_paging(self):
+        test_map = Map.Map(capacity=1)
+        self.addCleanup(test_map.close)
+        width, height = test_map.chunk_width, test_map.chunk_height
+        test_map.set_section((0, 0), Section.Section(name="First", width=width, height=height))
+        test_map.set_section((1, 0), Section.Section(name="Second", width=width, height=height))
+
+        # Only one section stays loaded, painting pages the other back in
+        self.assertEqual(list(test_map.loaded), [(1, 0)], msg="Least recently used section not paged out.")
+        test_map.paint_tile(1, 1, 2)
+        self.assertEqual(list(test_map.loaded), [(0, 0)], msg="Painted section not paged in.")
+
+        # A paged out section is only kept on disk, and edits survive being paged out and back in
+        evicted = weakref.ref(test_map.get_section((0, 0)))
+        test_map.get_tile(width, 0)
+        gc.collect()
+        self.assertNotIn((0, 0), test_map.loaded, msg="Section not paged out.")
+        self.assertIsNone(evicted(), msg="Paged out section still in memory.")
+        self.assertTrue(os.path.exists(test_map.page_path((0, 0))), msg="Paged out section not on disk.")
+        self.assertEqual(test_map.get_tile(1, 1), 2, msg="Edit lost when paging out.")
+        self.assertEqual(test_map.get_section((0, 0)).section_name, "First", msg="Paged in section not as expected.")
+        self.assertIsNotNone(test_map.get_section((0, 0)).mapping, msg="Paged in section not read from disk.")
+
+        # Removing a chunk removes its page file
+        test_map.remove_section((1, 0))
+        self.assertFalse(os.path.exists(test_map.page_path((1, 0))), msg="Page file of removed chunk not removed.")
+        self.assertEqual(test_map.get_tile(width, 0), 0, msg="Tile of removed chunk not void.")
+
+    def test_map_chunk_boundary(self):
+        test_map = Map.Map()
+        self.addCleanup(test_map.close)
+        width, height = test_map.chunk_width, test_map.chunk_height
+        test_map.set_section((0, 0), Section.Section(data=[1] * width * height, width=width, height=height))
+        test_map.set_section((1, 1), Section.Section(data=[2] * 4, width=2, height=2))
+
+        # Neighbouring world tiles in different chunks
+        self.assertEqual(test_map.get_tile(width - 1, height - 1), 1, msg="Tile before boundary not as expected.")
+        self.assertEqual(test_map.get_tile(width, height), 2, msg="Tile after boundary not as expected.")
+        self.assertEqual(test_map.get_tile(width, 0), 0, msg="Tile of an empty chunk not void.")
+        self.assertEqual(test_map.get_tile(width + 2, height), 0, msg="Tile outside a small section not void.")
+        self.assertEqual(test_map.get_tile(-1, 0), 0, msg="Tile of a negative chunk not void.")
+
     def test_section_error_handling(self):
         pass
 
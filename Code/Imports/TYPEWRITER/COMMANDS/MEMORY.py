@@ -1,36 +1,253 @@
 """
+The story's memory: flags (on or off) and variables (strings), declared in FLAGS.CSV as rows of name,!|?,default.
+"!" rows are flags and "?" rows are variables.
 
+The CSV is compiled once into a layout giving each name a slot. A Memory keeps its flags packed into the bits of an int
+and its variables in a fixed size list, so reads and writes are a slot lookup. Changed slots are tracked until taken,
+and subscribers are told which names changed. Memory is a Mapping of name > value, so it can be given to a Storyboard
+as its memory, which subscribes its scene cache to drop only the cached scenes reading a name when it changes.
 """
 
 import csv
+import logging
+import os
+from collections.abc import Mapping
 
+logger = logging.getLogger(__name__)
 
-def __init__(self):
-    flag = {}
-    var = {}
-    create_memory(read_CSV("FLAGS.CSV"))
+FLAGS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "FLAGS.CSV")
+FLAG, VAR = "!", "?"
 
 
-def update_flag():
-    pass
+def read_CSV(file):
+    with open(file, "r", newline="") as raw:
+        return [x for x in csv.reader(raw, delimiter=",")]
 
 
-def update_var():
-    pass
+class MemoryLayout:
+    """
+    The slots of every memory name, shared by every Memory made from the same CSV
+    """
 
+    __slots__ = ("flags", "vars", "flag_names", "var_names", "flag_defaults", "var_defaults")
 
-def read_CSV(file):
-    with open(file, "r") as raw:
-        return [x for x in csv.reader(raw, delimiter=",")]
+    def __init__(self, rows):
+        """
+        Compiles a layout
+
+        :param rows: [[str(name),str(!|?),str(default)],...]: FLAGS.CSV rows, blank rows are skipped
+        :raises ValueError: If a row is malformed or a name is declared twice
+        """
+
+        self.flags, self.vars = {}, {}  # Name > slot
+        self.flag_defaults, var_defaults = 0, []
+        for number, row in enumerate(rows, 1):
+            if not row:
+                continue
+            if len(row) != 3 or row[1] not in (FLAG, VAR):
+                raise ValueError("Row %d: expected name,%s|%s,default but got %r" % (number, FLAG, VAR, row))
+            name, kind, default = row
+            if name in self.flags or name in self.vars:
+                raise ValueError("Row %d: %s is declared twice" % (number, name))
+            if kind == FLAG:
+                self.flag_defaults |= bool(int(default)) << len(self.flags)
+                self.flags[name] = len(self.flags)
+            else:
+                self.vars[name] = len(var_defaults)
+                var_defaults.append(default)
+        self.flag_names, self.var_names = tuple(self.flags), tuple(self.vars)  # Slot > name
+        self.var_defaults = tuple(var_defaults)
+
+    def __len__(self):
+        return len(self.flags) + len(self.vars)
+
+
+_layouts = {}  # CSV file > ((modification time, size), MemoryLayout)
+
+
+def load_layout(file=FLAGS_FILE):
+    """
+    Gets the compiled layout of a CSV, compiling it again only if the file changed
+
+    :param file: str: Path of the CSV
+    :return: MemoryLayout
+    :raises OSError: If the CSV cannot be read
+    :raises ValueError: If the CSV is malformed
+    """
+
+    file = os.path.abspath(file)
+    stat = os.stat(file)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _layouts.get(file)
+    if cached is None or cached[0] != key:
+        logger.info("Compiling memory layout %s" % file)
+        cached = _layouts[file] = (key, MemoryLayout(read_CSV(file)))
+    return cached[1]
+
+
+class Memory(Mapping):
+    """
+    Flag and variable values laid out by a MemoryLayout
+    """
+
+    __slots__ = ("layout", "flags", "vars", "dirty_flags", "dirty_vars", "listeners")
+
+    def __init__(self, layout=None):
+        """
+        Initialises memory with the default values
+
+        :param layout: MemoryLayout: Layout to use, defaults to the layout of FLAGS.CSV
+        """
+
+        self.layout = load_layout() if layout is None else layout
+        self.flags = self.layout.flag_defaults  # Bit per flag slot
+        self.vars = list(self.layout.var_defaults)  # Value per variable slot
+        self.dirty_flags = 0  # Bit per changed flag slot
+        self.dirty_vars = set()  # Changed variable slots
+        self.listeners = []
+
+    def __getitem__(self, name):
+        slot = self.layout.flags.get(name)
+        if slot is not None:
+            return bool(self.flags >> slot & 1)
+        return self.vars[self.layout.vars[name]]
+
+    def __setitem__(self, name, value):
+        if name in self.layout.flags:
+            self.update_flag(name, value)
+        else:
+            self.update_var(name, value)
+
+    def __iter__(self):
+        yield from self.layout.flags
+        yield from self.layout.vars
+
+    def __len__(self):
+        return len(self.layout)
+
+    def __contains__(self, name):
+        return name in self.layout.flags or name in self.layout.vars
+
+    def update_flag(self, name, value):
+        """
+        Sets a flag, telling subscribers if it changed
+
+        :param name: str: Flag name
+        :param value: bool: Value
+        :raises KeyError: If the name is not a flag
+        """
+
+        bit = 1 << self.layout.flags[name]
+        flags = self.flags | bit if value else self.flags & ~bit
+        if flags != self.flags:
+            self.flags = flags
+            self.dirty_flags |= bit
+            self.notify([name])
+
+    def update_var(self, name, value):
+        """
+        Sets a variable, telling subscribers if it changed
+
+        :param name: str: Variable name
+        :param value: str: Value
+        :raises KeyError: If the name is not a variable
+        """
+
+        slot = self.layout.vars[name]
+        if self.vars[slot] != value:
+            self.vars[slot] = value
+            self.dirty_vars.add(slot)
+            self.notify([name])
+
+    def snapshot(self):
+        """
+        Copies every value, e.g. for a save game
+
+        :return: (int, tuple): Flag bits and variable values
+        """
+
+        return self.flags, tuple(self.vars)
+
+    def restore(self, snapshot):
+        """
+        Sets every value from a snapshot, telling subscribers which names changed
+
+        :param snapshot: (int, tuple): A snapshot of memory with the same layout
+        :raises ValueError: If the snapshot does not fit the layout
+        """
+
+        flags, values = snapshot
+        if len(values) != len(self.vars) or flags >> len(self.layout.flags):
+            raise ValueError("Snapshot does not fit the memory layout")
+        changed_flags = self.flags ^ flags
+        changed_vars = [slot for slot, value in enumerate(values) if self.vars[slot] != value]
+        self.flags, self.vars[:] = flags, values
+        self.dirty_flags |= changed_flags
+        self.dirty_vars.update(changed_vars)
+        names = self.flag_slot_names(changed_flags) + [self.layout.var_names[slot] for slot in changed_vars]
+        if names:
+            self.notify(names)
+
+    def reset(self):
+        """
+        Sets every value back to its default
+        """
+
+        self.restore((self.layout.flag_defaults, self.layout.var_defaults))
+
+    def flag_slot_names(self, bits):
+        """
+        Gets the names of the flag slots set in a bitmask
+
+        :param bits: int: Bit per flag slot
+        :return: [str]
+        """
+
+        return [name for slot, name in enumerate(self.layout.flag_names) if bits >> slot & 1]
+
+    def take_dirty(self):
+        """
+        Gets the names changed since the last call, and forgets them
+
+        :return: [str]
+        """
+
+        names = self.flag_slot_names(self.dirty_flags)
+        names += [self.layout.var_names[slot] for slot in sorted(self.dirty_vars)]
+        self.dirty_flags = 0
+        self.dirty_vars.clear()
+        return names
+
+    def subscribe(self, listener):
+        """
+        Adds a listener that is called whenever values change, unless it was already added
+
+        :param listener: callable: Takes a list of changed names
+        """
+
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """
+        Removes a listener added with subscribe
+
+        :param listener: callable: The listener to remove
+        """
+
+        self.listeners.remove(listener)
+
+    def notify(self, names):
+        """
+        Calls every listener with changed names
 
+        :param names: [str]: Names that changed
+        """
 
-def create_memory(arr):
-    [flag.update({x[0]: bool(int(x[2]))}) for x in arr if x[1] == "!"]
-    [var.update({x[0]: x[2]}) for x in arr if x[1] == "?"]
+        for listener in self.listeners:
+            listener(names)
 
 
 if __name__ == "__main__":
-    flag = {}
-    var = {}
-    create_memory(read_CSV("FLAGS.CSV"))
-    print("%s%s" % (flag, var))
+    memory = Memory()
+    print(dict(memory))
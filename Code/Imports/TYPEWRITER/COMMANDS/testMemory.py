@@ -0,0 +1,101 @@
+import unittest
+import os
+import tempfile
+from Imports.TYPEWRITER.COMMANDS import MEMORY
+from Imports.TYPEWRITER.STORYBOARD import STORYBOARD
+
+
+class MemoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.layout = MEMORY.MemoryLayout([["gameBegin", "!", "0"], ["doorOpen", "!", "1"], [],
+                                           ["charHead", "?", "-"]])
+        self.memory = MEMORY.Memory(self.layout)
+        self.changes = []
+        self.memory.subscribe(self.changes.append)
+
+    def test_flag_round_trip(self):
+        self.assertEqual(dict(self.memory), {"gameBegin": False, "doorOpen": True, "charHead": "-"},
+                         msg="Default values not as expected.")
+
+        # Values read back as written, and only real changes are told to subscribers
+        self.memory["gameBegin"] = True
+        self.memory["doorOpen"] = True
+        self.memory["charHead"] = "*"
+        self.assertEqual(dict(self.memory), {"gameBegin": True, "doorOpen": True, "charHead": "*"},
+                         msg="Written values not read back.")
+        self.assertEqual(self.changes, [["gameBegin"], ["charHead"]], msg="Changes not told to subscribers.")
+        self.memory.update_flag("gameBegin", False)
+        self.assertFalse(self.memory["gameBegin"], msg="Flag not cleared.")
+
+        with self.assertRaises(KeyError):
+            self.memory.update_flag("charHead", True)
+        with self.assertRaises(ValueError):
+            MEMORY.MemoryLayout([["gameBegin", "!", "0"], ["gameBegin", "?", "-"]])
+
+    def test_snapshot_restore(self):
+        snapshot = self.memory.snapshot()
+        self.memory["gameBegin"] = True
+        self.memory["charHead"] = "*"
+        changed = self.memory.snapshot()
+        del self.changes[:]
+
+        # Restoring tells subscribers only the names that differ
+        self.memory.restore(snapshot)
+        self.assertEqual(self.memory.snapshot(), snapshot, msg="Snapshot not restored.")
+        self.assertEqual(self.changes, [["gameBegin", "charHead"]], msg="Restored names not as expected.")
+        self.memory.restore(changed)
+        self.memory.reset()
+        self.assertEqual(self.memory.snapshot(), snapshot, msg="Memory not reset to defaults.")
+
+        with self.assertRaises(ValueError):
+            self.memory.restore((0b100, ("-",)))
+        with self.assertRaises(ValueError):
+            self.memory.restore((0, ()))
+
+    def test_take_dirty(self):
+        self.memory["doorOpen"] = False
+        self.memory["charHead"] = "*"
+        self.memory["gameBegin"] = True
+
+        # Dirty names are given in slot order and forgotten once taken
+        self.assertEqual(self.memory.take_dirty(), ["gameBegin", "doorOpen", "charHead"],
+                         msg="Dirty names not as expected.")
+        self.assertEqual(self.memory.take_dirty(), [], msg="Dirty names not cleared.")
+        self.memory["charHead"] = "*"
+        self.assertEqual(self.memory.take_dirty(), [], msg="Unchanged value marked dirty.")
+
+    def test_layout_reload(self):
+        with tempfile.TemporaryDirectory() as directory:
+            flags_file = os.path.join(directory, "FLAGS.CSV")
+            with open(flags_file, "w") as flags:
+                flags.write("gameBegin,!,0\n")
+            layout = MEMORY.load_layout(flags_file)
+            self.assertIs(MEMORY.load_layout(flags_file), layout, msg="Unchanged layout compiled again.")
+
+            with open(flags_file, "w") as flags:
+                flags.write("gameBegin,!,1\ncharHead,?,-\n")
+            self.assertEqual(MEMORY.Memory(MEMORY.load_layout(flags_file))["charHead"], "-",
+                             msg="Changed layout not compiled again.")
+
+    def test_storyboard_invalidation(self):
+        with tempfile.TemporaryDirectory() as directory:
+            story_file = os.path.join(directory, "STORY.txt")
+            with open(story_file, "w") as story:
+                story.write("~Head [charHead]\n#\n~Plain\n#\n")
+            storyboard = STORYBOARD.Storyboard(story_file, memory=self.memory)
+            STORYBOARD.Storyboard(story_file, memory=self.memory)
+            storyboard.get_scene(0)
+            storyboard.get_scene(2)
+            cache = storyboard.cache
+
+            # Changing a name drops only the cached scenes reading it, once however many Storyboards share the memory
+            self.assertEqual(self.memory.listeners.count(cache.invalidate_flags), 1,
+                             msg="Scene cache not subscribed once.")
+            self.memory["charHead"] = "*"
+            self.assertNotIn((story_file, 0), cache.entries, msg="Scene reading a changed name still cached.")
+            self.assertIn((story_file, 2), cache.entries, msg="Scene not reading a changed name dropped.")
+            cache.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+Checks the control flow of a compiled story before it is run.
+
+A scene starts at TP 0 or on the line after an END. Stories have no branches, so each scene is followed exactly from
+its start over (TP, return stack) states, and the analysis finds:
+- Unreachable lines, run by no scene
+- Unterminated scenes, stopping on an unknown command, a bad jump or the end of the file
+- Unbalanced returns, a RET with nothing to return to
+- Infinite cycles, a scene coming back to the same TP with the same return stack
+- Unbounded recursion, a return stack deeper than the number of jumps, which means a jump was taken again before
+  returning from it, and always will be
+It also works out how deep each scene's return stack gets, so a scene that passes can be run without checks, and
+any other run can be stopped as soon as its return stack is deeper than the number of jumps.
+"""
+
+import logging
+import sys
+from collections import namedtuple
+from Imports.TYPEWRITER.STORYBOARD import COMPILER
+
+logger = logging.getLogger(__name__)
+
+Scene = namedtuple("Scene", ("start", "end", "depth", "error"))  # Error is None when the scene reaches its END
+
+
+class Analysis:
+    """
+    The result of analysing a compiled story
+    """
+
+    __slots__ = ("scenes", "unreachable", "jumps")
+
+    def __init__(self, scenes, unreachable, jumps):
+        """
+        :param scenes: dict: Start TP > Scene
+        :param unreachable: [int]: TPs no scene runs
+        :param jumps: int: Jump lines in the story, the deepest return stack a run can have without recursing forever
+        """
+
+        self.scenes = scenes
+        self.unreachable = unreachable
+        self.jumps = jumps
+
+    @property
+    def max_depth(self):
+        return max((scene.depth for scene in self.scenes.values()), default=0)
+
+    def safe(self, tp):
+        """
+        Checks if the scene starting at a TP is known to reach its END
+
+        :param tp: int: Start TP
+        :return: bool
+        """
+
+        scene = self.scenes.get(tp)
+        return scene is not None and scene.error is None
+
+    def limit(self, tp, most=None):
+        """
+        Gets the return stack limit to run a scene with
+
+        :param tp: int: Start TP
+        :param most: int: Deepest return stack allowed, unlimited if None
+        :return: int or None: None when the scene is known to reach its END within most, so needs no limit
+        """
+
+        if self.safe(tp) and (most is None or self.scenes[tp].depth <= most):
+            return None
+        return self.jumps if most is None else min(self.jumps, most)
+
+    def problems(self):
+        """
+        Describes everything wrong with the story
+
+        :return: [str]
+        """
+
+        problems = ["Scene at TP %d: %s" % (scene.start, scene.error) for scene in self.scenes.values()
+                    if scene.error is not None]
+        ranges = []
+        for tp in self.unreachable:
+            if ranges and ranges[-1][1] == tp - 1:
+                ranges[-1][1] = tp
+            else:
+                ranges.append([tp, tp])
+        problems += ["TP %s: unreachable" % (str(start) if start == stop else "%d-%d" % (start, stop))
+                     for start, stop in ranges]
+        return problems
+
+
+def follow(program, start, reached, jumps):
+    """
+    Follows a scene from its start
+
+    :param program: COMPILER.Program: The compiled story
+    :param start: int: Start TP
+    :param reached: bytearray: Marked with every TP the scene runs
+    :param jumps: int: Jump lines in the story
+    :return: Scene
+    """
+
+    opcodes, args, strings = program.opcodes, program.args, program.strings
+    tp, stack, depth, seen = start, [], 0, set()
+    while True:
+        state = (tp, tuple(stack))
+        if state in seen:
+            return Scene(start, tp, depth, "TP %d: infinite cycle" % tp)
+        seen.add(state)
+        reached[tp] = 1
+        opcode = opcodes[tp]
+        if opcode == COMPILER.TEXT:
+            tp += 1
+        elif opcode == COMPILER.JMP:
+            if len(stack) >= jumps:
+                return Scene(start, tp, depth, "TP %d: unbounded recursion" % tp)
+            stack.append(tp + 1)
+            depth = max(depth, len(stack))
+            tp = args[tp]
+        elif opcode == COMPILER.RET:
+            if not stack:
+                return Scene(start, tp, depth, "TP %d: return without a jump" % tp)
+            tp = stack.pop()
+        elif opcode == COMPILER.END:
+            return Scene(start, tp, depth, None)
+        else:
+            return Scene(start, tp, depth, strings[args[tp]])
+
+
+def analyse_program(program):
+    """
+    Analyses every scene of a compiled story
+
+    :param program: COMPILER.Program: The compiled story
+    :return: Analysis
+    """
+
+    reached = bytearray(len(program) + 1)
+    jumps = program.opcodes.count(COMPILER.JMP)
+    starts = [0] + [tp + 1 for tp, opcode in enumerate(program.opcodes[:-2]) if opcode == COMPILER.END]
+    scenes = {start: follow(program, start, reached, jumps) for start in starts if start < len(program)}
+    return Analysis(scenes, [tp for tp in range(len(program)) if not reached[tp]], jumps)
+
+
+_analyses = {}  # Story hash > Analysis
+
+
+def analyse(program):
+    """
+    Gets the analysis of a compiled story, analysing it and logging its problems the first time it is seen
+
+    :param program: COMPILER.Program: The compiled story
+    :return: Analysis
+    """
+
+    analysis = _analyses.get(program.digest)
+    if analysis is None:
+        analysis = _analyses[program.digest] = analyse_program(program)
+        for problem in analysis.problems():
+            logger.warning(problem)
+    return analysis
+
+
+if __name__ == "__main__":
+    for story_file in sys.argv[1:]:
+        program = COMPILER.load(story_file)
+        if program is not None:
+            problems = analyse_program(program).problems()
+            print("%s: %s" % (story_file, "\n  ".join(["%d problems" % len(problems)] + problems)))
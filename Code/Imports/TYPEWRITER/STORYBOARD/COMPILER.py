@@ -0,0 +1,370 @@
+"""
+Compiles a story file into instructions for Storyboard to run.
+
+Each line of the story file (TP) becomes one instruction, an opcode and its operands:
+TEXT - flags~message, shows a message. Operands are the message and flags, as indexes into the string table
+JMP  - ^TP, jumps to a TP and remembers the line after it. Operand is the TP, checked when compiling
+RET  - /, returns to the TP remembered by the last jump
+END  - #, ends the scene
+BAD  - anything else, stops the story. Operand is the error message
+
+Compiled stories are kept in __pycache__ next to the story file, keyed by the hash of the file, so a story is only
+compiled again when it changes.
+"""
+
+import hashlib
+import logging
+import marshal
+import os
+import re
+import sys
+import threading
+from array import array
+
+logger = logging.getLogger(__name__)
+
+TEXT, JMP, RET, END, BAD = range(5)
+OPCODES = ("TEXT", "JMP", "RET", "END", "BAD")
+
+MARKERS = {
+    "SPA": "~",
+    "END": "#",
+    "JMP": "^",
+    "RET": "/"
+}
+
+VERSION = 2
+# Line breaks between TPs, shared with READER. Other breaks str.splitlines knows, such as form feeds and \u2028, are
+# part of a line
+LINE_BREAK = re.compile(rb"\r\n|\r|\n")
+MEMORY_TOKEN = re.compile(r"\[[!?]?(\w+)\]")  # [name], [?name] or [!name], a memory value in a message
+
+
+class Program:
+    """
+    A compiled story file. Instructions are stored in parallel arrays indexed by TP, and strings are stored once
+    in a shared table. One extra instruction past the last line stops stories that run off the end of the file.
+
+    Programs are shared by every Storyboard reading the same file and must not be changed.
+    """
+
+    __slots__ = ("digest", "opcodes", "args", "flag_ids", "strings")
+
+    def __init__(self, digest, opcodes, args, flag_ids, strings):
+        """
+        Initialises a program from its arrays
+
+        :param digest: str: Hash of the story file
+        :param opcodes: bytes: Opcode of each TP
+        :param args: array: Message index of TEXT, TP of JMP and error index of BAD, for each TP
+        :param flag_ids: array: Flags index of TEXT for each TP
+        :param strings: tuple: Interned messages, flags and errors
+        """
+
+        self.digest = digest
+        self.opcodes = opcodes
+        self.args = args
+        self.flag_ids = flag_ids
+        self.strings = strings
+
+    def __len__(self):
+        return len(self.opcodes) - 1  # Without the end of file instruction
+
+    def fetch(self, tp):
+        """
+        Decodes the instruction at a TP for running
+
+        :param tp: int: Text pointer
+        :return: (int, int or str, str): Opcode, operand (TP, message or error) and flags
+        """
+
+        opcode = self.opcodes[tp]
+        if opcode == TEXT:
+            return opcode, self.strings[self.args[tp]], self.strings[self.flag_ids[tp]]
+        if opcode == BAD:
+            return opcode, self.strings[self.args[tp]], ""
+        return opcode, self.args[tp], ""
+
+    def instruction(self, tp):
+        """
+        Decodes the instruction at a TP, for logging and tools
+
+        :param tp: int: Text pointer
+        :return: (str, ...): Opcode name and operands
+        """
+
+        opcode = self.opcodes[tp]
+        if opcode == TEXT:
+            return OPCODES[opcode], self.strings[self.args[tp]], self.strings[self.flag_ids[tp]]
+        if opcode == JMP:
+            return OPCODES[opcode], self.args[tp]
+        if opcode == BAD:
+            return OPCODES[opcode], self.strings[self.args[tp]]
+        return OPCODES[opcode],
+
+
+class Cursor:
+    """
+    A place in a running story: its TP, return stack and how its scene ended
+    """
+
+    __slots__ = ("tp", "stack", "done", "error")
+
+    def __init__(self, tp=0, stack=None):
+        """
+        Initialises a cursor at the start of a scene
+
+        :param tp: int: TP the scene starts at
+        :param stack: list: Return stack, a new one if not given
+        """
+
+        self.tp = tp
+        self.stack = [] if stack is None else stack
+        self.done = False
+        self.error = None
+
+
+def execute(story, cursor, max_stack=None):
+    """
+    Runs a story from a cursor until the end of the scene, giving each entry as it is reached. The cursor follows the
+    run, so taking only some entries pauses the scene and taking more carries on from there. Every way of running a
+    story goes through here.
+
+    :param story: Program or READER.StoryReader: The story, anything with fetch(tp)
+    :param cursor: Cursor: Where to run from, done once the scene reaches its END or stops on an error
+    :param max_stack: int: Deepest the return stack may grow before the scene is stopped, unlimited if None
+    :return: generator of [str(message),str(flags)]
+    """
+
+    fetch, stack, tp = story.fetch, cursor.stack, cursor.tp
+    try:
+        while True:
+            opcode, operand, flags = fetch(tp)
+            if opcode == TEXT:  # Normal message
+                tp += 1
+                cursor.tp = tp
+                yield [operand, flags]
+            elif opcode == JMP:
+                if max_stack is not None and len(stack) >= max_stack:
+                    cursor.error = "TP %d: return stack deeper than %d" % (tp, max_stack)
+                    break
+                stack.append(tp + 1)
+                tp = operand
+            elif opcode == RET:
+                if not stack:
+                    cursor.error = "TP %d: return without a jump" % tp
+                    break
+                tp = stack.pop()
+            elif opcode == END:
+                break
+            else:
+                cursor.error = operand
+                break
+    finally:
+        cursor.tp = tp
+    cursor.done = True
+    if cursor.error is not None:
+        logger.error(cursor.error)
+
+
+def memory_reads(messages):
+    """
+    Finds the memory names messages read
+
+    :param messages: [str]: Messages
+    :return: tuple: Memory names, sorted
+    """
+
+    return tuple(sorted({name for message in messages for name in MEMORY_TOKEN.findall(message)}))
+
+
+def parse_line(line, tp, length):
+    """
+    Parses one line of a story file
+
+    :param line: str: The line, without its line break
+    :param tp: int: TP of the line, for errors
+    :param length: int: Lines in the story file, to check jumps
+    :return: (int, int or str, str): Opcode, operand (TP, message or error) and flags
+    """
+
+    if MARKERS["SPA"] in line:  # Normal message
+        flags, _, message = line.partition(MARKERS["SPA"])
+        return TEXT, message, flags
+    marker, command = line[:1], line[1:]
+    if marker == MARKERS["JMP"]:
+        try:
+            target = int(command)
+        except ValueError:
+            return BAD, "TP %d: jump to %r is not a TP" % (tp, command), ""
+        if not 0 <= target < length:
+            return BAD, "TP %d: jump to %d is outside the story" % (tp, target), ""
+        return JMP, target, ""
+    if marker == MARKERS["RET"]:
+        return RET, 0, ""
+    if line == MARKERS["END"]:
+        return END, 0, ""
+    return BAD, "TP %d: unknown command %r" % (tp, line), ""
+
+
+def compile_story(data, digest=None):
+    """
+    Compiles the contents of a story file
+
+    :param data: bytes: Contents of the story file
+    :param digest: str: Hash of the contents, worked out if not given
+    :return: Program
+    """
+
+    lines = [line.decode() for line in LINE_BREAK.split(data)] if data else []
+    if lines and not lines[-1]:  # Line break at the end of the file
+        lines.pop()
+    strings, string_ids = [], {}
+
+    def intern(string):
+        if string not in string_ids:
+            string_ids[string] = len(strings)
+            strings.append(sys.intern(string))
+        return string_ids[string]
+
+    opcodes, args, flag_ids = bytearray(), array("l"), array("l")
+    for tp, line in enumerate(lines):
+        opcode, operand, flags = parse_line(line, tp, len(lines))
+        opcodes.append(opcode)
+        args.append(intern(operand) if opcode in (TEXT, BAD) else operand)
+        flag_ids.append(intern(flags))
+
+    opcodes.append(BAD)  # Running off the end of the file
+    args.append(intern("TP %d: reached the end of the story without %s" % (len(lines), MARKERS["END"])))
+    flag_ids.append(intern(""))
+    return Program(digest or hash_story(data), bytes(opcodes), args, flag_ids, tuple(strings))
+
+
+def hash_story(data):
+    """
+    Hashes the contents of a story file
+
+    :param data: bytes: Contents of the story file
+    :return: str
+    """
+
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def cache_path(story_file):
+    """
+    Gets the file a compiled story is kept in
+
+    :param story_file: str: Path of the story file
+    :return: str
+    """
+
+    directory, name = os.path.split(os.path.abspath(story_file))
+    return os.path.join(directory, "__pycache__", "%s.story" % name)
+
+
+def read_cache(story_file, digest):
+    """
+    Reads a compiled story, if it was compiled from the same contents
+
+    :param story_file: str: Path of the story file
+    :param digest: str: Hash of the story file
+    :return: Program or None
+    """
+
+    try:
+        with open(cache_path(story_file), "rb") as file:
+            version, itemsize, cached_digest, opcodes, args, flag_ids, strings = marshal.load(file)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if (version, itemsize, cached_digest) != (VERSION, array("l").itemsize, digest):
+        logger.debug("Compiled story %s is out of date" % cache_path(story_file))
+        return None
+    return Program(digest, opcodes, array("l", args), array("l", flag_ids), tuple(map(sys.intern, strings)))
+
+
+def write_cache(story_file, program):
+    """
+    Writes a compiled story. Failing to write only logs, the cache is an optimisation
+
+    :param story_file: str: Path of the story file
+    :param program: Program: The compiled story
+    """
+
+    path = cache_path(story_file)
+    temp_path = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())  # Unique per writing thread
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp_path, "wb") as file:
+            marshal.dump((VERSION, array("l").itemsize, program.digest, program.opcodes, program.args.tobytes(),
+                          program.flag_ids.tobytes(), program.strings), file)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning("Could not write compiled story %s: %s" % (path, e))
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+_programs = {}  # Story file > ((modification time, size), Program)
+_locks = {}  # Story file > lock held while it is compiled
+
+
+def loaded(story_file):
+    """
+    Gets the compiled story of a story file if it is already compiled and the file is unchanged, without reading it
+
+    :param story_file: str: Path of the story file
+    :return: Program or None if the story needs loading
+    """
+
+    cached = _programs.get(os.path.abspath(story_file))
+    try:
+        stat = os.stat(story_file)
+    except OSError:
+        return None
+    return cached[1] if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size) else None
+
+
+def load(story_file):
+    """
+    Gets the compiled story of a story file, compiling it only when the file changed since it was last compiled.
+    Every caller gets the same Program until the file changes. A story is compiled by one thread at a time, the
+    others wait for its Program
+
+    :param story_file: str: Path of the story file
+    :return: Program or None if the file cannot be read
+    """
+
+    story_file = os.path.abspath(story_file)
+    with _locks.setdefault(story_file, threading.Lock()):
+        return load_locked(story_file)
+
+
+def load_locked(story_file):
+    """
+    Loads a story file for load, holding its lock
+
+    :param story_file: str: Absolute path of the story file
+    :return: Program or None if the file cannot be read
+    """
+
+    try:
+        stat = os.stat(story_file)
+    except OSError:
+        logger.error("%s not found." % story_file)
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+    if story_file in _programs and _programs[story_file][0] == key:
+        return _programs[story_file][1]
+
+    logger.info("Opening %s" % story_file)
+    with open(story_file, "rb") as story:
+        data = story.read()
+    digest = hash_story(data)
+    program = read_cache(story_file, digest)
+    if program is None:
+        logger.info("Compiling %s" % story_file)
+        program = compile_story(data, digest)
+        write_cache(story_file, program)
+    _programs[story_file] = (key, program)
+    return program
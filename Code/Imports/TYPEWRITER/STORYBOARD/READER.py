@@ -0,0 +1,184 @@
+"""
+Reads lines of a story file on demand, for story files too large to compile into memory.
+
+The file is memory mapped, and an index of where each line (TP) starts is built once and kept in __pycache__ next to
+the story file, so reading any TP is a seek rather than a scan. Only the lines a scene runs are decoded.
+"""
+
+import logging
+import mmap
+import os
+import struct
+from array import array
+from Imports.TYPEWRITER.STORYBOARD import COMPILER
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TPIX"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQ")  # Magic, version, modification time and size of the story file. 8 byte aligned
+
+
+class StoryReader:
+    """
+    Random access to the lines of a story file. Readers are shared by every Storyboard streaming the same file, see
+    open_story.
+    """
+
+    def __init__(self, story_file):
+        """
+        Maps a story file and loads or builds its line index
+
+        :param story_file: str: Path of the story file
+        :raises OSError: If the story file cannot be read
+        """
+
+        self.story_file = os.path.abspath(story_file)
+        stat = os.stat(self.story_file)
+        self.key = (stat.st_mtime_ns, stat.st_size)
+        self.digest = "%d-%d" % self.key  # Changes with the file, like the hash of a compiled story
+        with open(self.story_file, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+        self.offsets = self.read_index()
+        if self.offsets is None:
+            self.offsets = self.build_index()
+            self.write_index()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def close(self):
+        """
+        Unmaps the story file
+        """
+
+        if isinstance(self.offsets, memoryview):
+            self.offsets.release()
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def index_path(self):
+        """
+        Gets the file the line index is kept in
+
+        :return: str
+        """
+
+        directory, name = os.path.split(self.story_file)
+        return os.path.join(directory, "__pycache__", "%s.index" % name)
+
+    def build_index(self):
+        """
+        Finds where every line starts, plus the end of the file
+
+        :return: array: Byte offset of each TP
+        """
+
+        logger.info("Indexing %s" % self.story_file)
+        offsets = array("Q", [0])
+        offsets.extend(match.end() for match in COMPILER.LINE_BREAK.finditer(self.data))
+        if offsets[-1] != len(self.data):  # Last line without a line break
+            offsets.append(len(self.data))
+        return offsets
+
+    def read_index(self):
+        """
+        Maps the saved line index, if it was built from the same file
+
+        :return: memoryview or None: Byte offset of each TP
+        """
+
+        try:
+            with open(self.index_path(), "rb") as file:
+                index = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(index) < HEADER.size or HEADER.unpack_from(index) != (MAGIC, VERSION) + self.key:
+            logger.debug("Line index %s is out of date" % self.index_path())
+            index.close()
+            return None
+        return memoryview(index)[HEADER.size:].cast("Q")
+
+    def write_index(self):
+        """
+        Saves the line index. Failing to write only logs, the index is an optimisation
+        """
+
+        path = self.index_path()
+        temp_path = "%s.%d.tmp" % (path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, "wb") as file:
+                file.write(HEADER.pack(MAGIC, VERSION, *self.key))
+                self.offsets.tofile(file)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning("Could not write line index %s: %s" % (path, e))
+
+    def line(self, tp):
+        """
+        Reads one line
+
+        :param tp: int: Text pointer
+        :return: str: The line without its line break
+        """
+
+        line = self.data[self.offsets[tp]:self.offsets[tp + 1]]
+        if line.endswith(b"\r\n"):
+            line = line[:-2]
+        elif line.endswith((b"\n", b"\r")):
+            line = line[:-1]
+        return line.decode()
+
+    def fetch(self, tp):
+        """
+        Reads and parses the instruction at a TP. Past the last line, stops like the end of a compiled story
+
+        :param tp: int: Text pointer
+        :return: (int, int or str, str): Opcode, operand (TP, message or error) and flags
+        """
+
+        if tp >= len(self):
+            return COMPILER.BAD, "TP %d: reached the end of the story without %s" % (tp, COMPILER.MARKERS["END"]), ""
+        return COMPILER.parse_line(self.line(tp), tp, len(self))
+
+    def lines(self, start=0, stop=None):
+        """
+        Reads lines lazily
+
+        :param start: int: First TP
+        :param stop: int: TP after the last, defaults to the end of the story
+        :return: generator of str
+        """
+
+        for tp in range(start, len(self) if stop is None else min(stop, len(self))):
+            yield self.line(tp)
+
+
+_readers = {}  # Story file > StoryReader
+
+
+def open_story(story_file):
+    """
+    Gets the shared reader of a story file, opening it again if the file changed. A replaced reader stays mapped
+    until nothing uses it
+
+    :param story_file: str: Path of the story file
+    :return: StoryReader or None if the file cannot be read
+    """
+
+    story_file = os.path.abspath(story_file)
+    try:
+        stat = os.stat(story_file)
+    except OSError:
+        logger.error("%s not found." % story_file)
+        return None
+    reader = _readers.get(story_file)
+    if reader is None or reader.key != (stat.st_mtime_ns, stat.st_size):
+        logger.info("Opening %s" % story_file)
+        try:
+            _readers[story_file] = StoryReader(story_file)
+        except OSError as e:
+            logger.error("Could not open %s: %s" % (story_file, e))
+            return None
+    return _readers[story_file]
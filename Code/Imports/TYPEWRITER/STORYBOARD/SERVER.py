@@ -0,0 +1,253 @@
+"""
+Serves story scenes to front ends over asyncio, one session per connection.
+
+Requests and responses are JSON objects, one per line. A request may carry an "id", which is copied to its response.
+{"cmd": "start", "tp": 0, "limit": 16} - start a scene at a TP and read its first entries
+{"cmd": "next", "limit": 16}           - read the next entries of the scene
+{"cmd": "close"}                       - end the session
+Scene responses are {"entries": [[message, flags], ...], "tp": TP, "done": bool, "error": str or null}, and failed
+requests get {"error": str}.
+
+Every session shares the same compiled story and keeps only a cursor, its TP and return stack. Entries are sent a page
+at a time as the front end asks for them, so a session never holds a whole scene.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+from Imports.TYPEWRITER.STORYBOARD import ANALYZER, COMPILER
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE = 64  # Most entries sent in one response
+MAX_STACK = 64  # Deepest a session's return stack may grow
+
+
+class Session(COMPILER.Cursor):
+    """
+    A player's place in the story: the compiled story it is reading, its TP and its return stack
+    """
+
+    __slots__ = ("program", "scene")
+
+    def __init__(self):
+        super().__init__()
+        self.program = None
+        self.scene = None  # Running scene, see COMPILER.execute
+        self.done = True
+
+    def start(self, program, tp):
+        """
+        Starts a scene
+
+        :param program: COMPILER.Program: The compiled story, kept until the next scene so a scene is not changed by
+            the story file being edited part way through
+        :param tp: int: TP the scene starts at
+        """
+
+        if self.scene is not None:
+            self.scene.close()  # Before the cursor is reset, closing moves it to where the old scene stopped
+        COMPILER.Cursor.__init__(self, tp)
+        self.program, self.scene = program, None
+        if not 0 <= tp < len(program):
+            self.fail("TP %d is outside the story" % tp)
+            return
+        # Scenes analysed to reach their END within MAX_STACK run without a stack limit
+        self.scene = COMPILER.execute(program, self, ANALYZER.analyse(program).limit(tp, MAX_STACK))
+
+    def fail(self, error):
+        """
+        Ends the scene with an error
+
+        :param error: str: The error
+        """
+
+        logger.error(error)
+        self.done, self.error = True, error
+
+    def read(self, limit):
+        """
+        Runs the scene until enough entries are read or the scene ends
+
+        :param limit: int: Most entries to read
+        :return: [[str(message),str(flags)],...]
+        """
+
+        if self.done:
+            return []
+        return list(itertools.islice(self.scene, limit))
+
+
+class StoryServer:
+    """
+    Serves one story file to any number of sessions
+    """
+
+    def __init__(self, story_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "STORYBOARD.txt")):
+        """
+        Initialises a server
+
+        :param story_file: str: Story file to serve
+        """
+
+        self.story_file = story_file
+        self.sessions = 0  # Open sessions
+
+    def load_story(self):
+        """
+        Loads the story, compiling the story file if it changed, and analyses it
+
+        :return: COMPILER.Program or None if the story file cannot be read
+        """
+
+        program = COMPILER.load(self.story_file)
+        if program is not None:
+            ANALYZER.analyse(program)
+        return program
+
+    async def dispatch(self, session, request):
+        """
+        Handles one request of a session
+
+        :param session: Session: The session
+        :param request: dict: The request
+        :return: dict: The response
+        """
+
+        try:
+            cmd = request["cmd"]
+            if cmd == "start":
+                tp = int(request["tp"])
+                # Compiling a changed story file would hold up every session, so it runs on a worker thread
+                program = COMPILER.loaded(self.story_file)
+                if program is None:
+                    program = await asyncio.get_running_loop().run_in_executor(None, self.load_story)
+                if program is None:
+                    raise ValueError("Story is not available")
+                session.start(program, tp)
+            elif cmd == "close":
+                return {"ok": True}
+            elif cmd != "next":
+                raise ValueError("Unknown command %r" % cmd)
+            limit = min(max(int(request.get("limit", MAX_PAGE)), 1), MAX_PAGE)
+        except (KeyError, TypeError, ValueError) as e:
+            return {"error": str(e) if not isinstance(e, KeyError) else "Missing %s" % e}
+        return {"entries": session.read(limit), "tp": session.tp, "done": session.done, "error": session.error}
+
+    async def handle(self, reader, writer):
+        """
+        Runs a session over a connection until it closes
+
+        :param reader: asyncio.StreamReader: Requests
+        :param writer: asyncio.StreamWriter: Responses
+        """
+
+        session = Session()
+        self.sessions += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("Request is not an object")
+                except ValueError as e:
+                    request, response = {}, {"error": "Bad request: %s" % e}
+                else:
+                    response = await self.dispatch(session, request)
+                if "id" in request:
+                    response["id"] = request["id"]
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()  # Waits while the front end is not reading
+                if request.get("cmd") == "close":
+                    break
+        except ConnectionError as e:
+            logger.debug("Session lost: %s" % e)
+        finally:
+            self.sessions -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError as e:
+                logger.debug("Session closed uncleanly: %s" % e)
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """
+        Serves sessions over TCP until cancelled
+
+        :param host: str: Address to listen on
+        :param port: int: Port to listen on
+        """
+
+        server = await asyncio.start_server(self.handle, host, port)
+        logger.info("Serving %s on %s:%d" % (self.story_file, host, port))
+        async with server:
+            await server.serve_forever()
+
+
+class LocalTransport:
+    """
+    An in-process connection to a StoryServer, for tests and for front ends running in the same process.
+    Requests go through the same JSON lines and session handling as a TCP connection
+    """
+
+    class Writer:
+        """
+        The server's end of the connection, feeding responses to the client's reader
+        """
+
+        def __init__(self, reader):
+            self.reader = reader
+
+        def write(self, data):
+            self.reader.feed_data(data)
+
+        async def drain(self):
+            pass
+
+        def close(self):
+            self.reader.feed_eof()
+
+        async def wait_closed(self):
+            pass
+
+    def __init__(self, server):
+        """
+        Opens a session on a server. Must be created inside a running event loop
+
+        :param server: StoryServer: The server
+        """
+
+        self.requests, self.responses = asyncio.StreamReader(), asyncio.StreamReader()
+        self.task = asyncio.get_running_loop().create_task(server.handle(self.requests,
+                                                                         self.Writer(self.responses)))
+
+    async def request(self, **request):
+        """
+        Sends a request and waits for its response
+
+        :param request: The request fields, e.g. cmd="start", tp=0
+        :return: dict: The response
+        """
+
+        self.requests.feed_data(json.dumps(request).encode() + b"\n")
+        line = await self.responses.readline()
+        if not line:
+            raise ConnectionError("Session closed")
+        return json.loads(line)
+
+    async def close(self):
+        """
+        Ends the session
+        """
+
+        self.requests.feed_eof()
+        await self.task
+
+
+if __name__ == "__main__":
+    asyncio.run(StoryServer().serve())
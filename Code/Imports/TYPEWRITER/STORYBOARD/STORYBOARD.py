@@ -1,47 +1,202 @@
+import asyncio
 import os
 import logging
+from collections import OrderedDict
+from Imports.TYPEWRITER.STORYBOARD import ANALYZER, COMPILER, READER
 
 logger = logging.getLogger(__name__)
 
 
+class SceneCache:
+    """
+    Least recently used cache of finished scenes, shared by every Storyboard.
+
+    Scenes are keyed by story file and start TP. Each entry remembers the compiled story it was run from and the
+    memory values its messages read ([name] tokens), and is only used while both are unchanged. invalidate_flags
+    drops the scenes reading given memory names straight away, for when memory changes. Scenes are kept as tuples,
+    so nothing handed a cached scene can change it.
+    """
+
+    def __init__(self, size):
+        """
+        Initialises an empty cache
+
+        :param size: int: Most scenes to keep
+        """
+
+        self.size = size
+        self.entries = OrderedDict()  # (story file, TP) > (digest, reads, values, scene tuple, end TP)
+        self.readers = {}  # Memory name > keys of the scenes reading it
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, digest, memory):
+        """
+        Gets a cached scene, if the story and the memory it read are unchanged
+
+        :param key: (str, int): Story file and start TP
+        :param digest: str: Hash of the current compiled story
+        :param memory: Mapping or None: Memory values are read from
+        :return: (tuple, int) or None: Scene as ((message, flags), ...) and end TP
+        """
+
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != digest or entry[2] != self.read_values(entry[1], memory):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[3], entry[4]
+
+    def put(self, key, digest, memory, scene, end):
+        """
+        Caches a finished scene, evicting the least recently used scene when full
+
+        :param key: (str, int): Story file and start TP
+        :param digest: str: Hash of the compiled story the scene was run from
+        :param memory: Mapping or None: Memory values were read from
+        :param scene: [[str(message),str(flags)],...]: The scene, copied
+        :param end: int: TP the scene ended at
+        """
+
+        self.discard(key)
+        scene = tuple(tuple(entry) for entry in scene)
+        reads = COMPILER.memory_reads(message for message, flags in scene)
+        self.entries[key] = (digest, reads, self.read_values(reads, memory), scene, end)
+        for name in reads:
+            self.readers.setdefault(name, set()).add(key)
+        while len(self.entries) > self.size:
+            self.discard(next(iter(self.entries)))
+
+    def discard(self, key):
+        """
+        Drops a cached scene
+
+        :param key: (str, int): Story file and start TP
+        """
+
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            for name in entry[1]:
+                self.readers[name].discard(key)
+                if not self.readers[name]:
+                    del self.readers[name]
+
+    def invalidate_flags(self, names):
+        """
+        Drops every cached scene reading any of the given memory names
+
+        :param names: [str]: Changed memory names
+        """
+
+        for name in names:
+            for key in list(self.readers.get(name, ())):
+                self.discard(key)
+
+    def clear(self):
+        """
+        Drops every cached scene
+        """
+
+        self.entries.clear()
+        self.readers.clear()
+
+    @staticmethod
+    def read_values(reads, memory):
+        """
+        Reads the memory values a scene depends on
+
+        :param reads: tuple: Memory names
+        :param memory: Mapping or None: Memory to read from
+        :return: tuple: Values, empty without memory
+        """
+
+        if memory is None or not reads:
+            return ()
+        return tuple(memory.get(name) for name in reads)
+
+
 class Storyboard:
-    MARKERS = {
-        "SPA": "~",
-        "END": "#",
-        "JMP": "^",
-        "RET": "/"
-    }
+    MARKERS = COMPILER.MARKERS
+    MAX_STACK = 64  # Deepest return stack of a streamed story, which is not analysed
+    cache = SceneCache(256)  # Shared by every Storyboard
 
-    def __init__(self, story_file="%s%s" % (os.getcwd(), "\Imports\TYPEWRITER\STORYBOARD\STORYBOARD.txt")):
+    def __init__(self, story_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "STORYBOARD.txt"),
+                 memory=None, stream=False):
         """
         Initialise Storyboard with default values
 
         :param story_file: Storyboard text file
+        :param memory: Mapping of memory names to values that messages read, scenes are cached against it. If it can
+            be subscribed to, like MEMORY.Memory, cached scenes reading a name are dropped as soon as it changes
+        :param stream: Read lines from the story file as scenes run instead of compiling it, for very large stories
         """
 
         self.TP = 0
         self.clean()
-        self.story_file = story_file
-
-        self.actions = {
-            self.MARKERS["JMP"]: self.jump,
-            self.MARKERS["RET"]: self.return_to
-        }
+        self.story_file = os.path.abspath(story_file)
+        self.memory = memory
+        self.stream = stream
+        if hasattr(memory, "subscribe"):
+            memory.subscribe(self.cache.invalidate_flags)
 
     def get_scene(self, start_position):
         """
-        Run the storyboard starting from given text pointer
+        Run the storyboard starting from given text pointer, or reuse the scene if it was already run and nothing it
+        depends on changed
 
         :param start_position: starting text pointer
         :return: [[str(message),str(flags)],...]
         """
+        for _ in self.iter_scene(start_position):
+            pass
+
+        return self.scene
+
+    def iter_scene(self, start_position):
+        """
+        Run the storyboard starting from given text pointer, giving each entry as soon as it is reached. The story only
+        runs as far as entries are taken, so closing the generator early stops the scene. A scene is only cached once
+        it has been run to its end
+
+        :param start_position: starting text pointer
+        :return: generator of [str(message),str(flags)]
+        """
         logger.info("Cleaning memory")
         self.clean()
+        program = self.load_story()
+        key = (self.story_file, start_position)
+        cached = self.cache.get(key, program.digest, self.memory) if program else None
+        if cached is not None:
+            logger.info('Reusing story TP %d' % start_position)
+            scene, self.TP = cached
+            self.scene = [list(entry) for entry in scene]
+            self.finished = True
+            yield from self.scene
+            return
+
         logger.info('Gathering story TP %d' % start_position)
         self.TP = start_position
-        self.main()
+        yield from self.run(program)
+        if self.finished:
+            self.cache.put(key, program.digest, self.memory, self.scene, self.TP)
 
-        return self.scene
+    async def aiter_scene(self, start_position):
+        """
+        Asynchronous iter_scene, letting other tasks run between entries
+
+        :param start_position: starting text pointer
+        :return: async generator of [str(message),str(flags)]
+        """
+        scene = self.iter_scene(start_position)
+        try:
+            for entry in scene:
+                yield entry
+                await asyncio.sleep(0)
+        finally:
+            scene.close()
 
     def clean(self):
         """
@@ -49,64 +204,58 @@ class Storyboard:
         """
         self.scene = []
         self.RET_list = []
+        self.finished = False
 
-    def jump(self, command):
-        """
-        Handles Jump action
-        :param command: which line to jump to
+    def load_story(self):
         """
-        self.RET_list.append(self.TP + 1)
-        logger.debug("Return list:%s" % self.RET_list)
-        self.TP = int(command)
-        logger.debug("Jumping to %d" % self.TP)
+        Loads the story, compiling the story file if it changed, or opening it for streaming
 
-    def return_to(self, command):
+        :return: COMPILER.Program, READER.StoryReader when streaming, or None if the story file cannot be read
         """
-        Handles Return action
-        :param command: Redundant
-        """
-        self.TP = self.RET_list.pop()
-        logger.debug("Returning to %d" % self.TP)
+        return READER.open_story(self.story_file) if self.stream else COMPILER.load(self.story_file)
 
-    def load_story(self):
+    def main(self, program=None):
         """
-        Loads story from story file
+        Main function to process the story, running the story from TP until the end of the scene
+
+        :param program: COMPILER.Program or READER.StoryReader: The story, loaded if not given
+        :return: bool: True if the scene reached its end, False if it stopped on an error
         """
-        logger.info("Opening %s" % self.story_file)
-        try:
-            with open(self.story_file, "r") as story:
-                raw = story.read().splitlines()
-                logger.info("Story file opened.")
-                return raw
-        except FileNotFoundError:
-            logger.error("%s not found." % self.story_file)
-            return []
+        for _ in self.run(program):
+            pass
 
-    def main(self):
+        return self.finished
+
+    def run(self, program=None):
         """
-        Main function to process the story
+        Runs the story from TP, adding each entry to the scene and giving it as it is reached.
+        Sets finished once the scene reaches its end. A compiled story is analysed the first time it is run, logging
+        any problems with its control flow, and a scene not known to reach its end is stopped once its return stack is
+        deeper than the story has jumps, as it would recurse forever
+
+        :param program: COMPILER.Program or READER.StoryReader: The story, loaded if not given
+        :return: generator of [str(message),str(flags)]
         """
-        raw = self.load_story()
-        if not raw:
+        self.finished = False
+        program = self.load_story() if program is None else program
+        if not program:
             logger.error("Failed to load story, exiting...")
             return
+        if not 0 <= self.TP < len(program):
+            logger.error("TP %d is outside the story" % self.TP)
+            return
 
-        current = ""
-
+        if isinstance(program, COMPILER.Program):
+            max_stack = ANALYZER.analyse(program).limit(self.TP)
+        else:
+            max_stack = self.MAX_STACK
+        cursor = COMPILER.Cursor(self.TP, self.RET_list)
         logger.info("Creating Stack")
-        while current != self.MARKERS["END"]:
-            current = raw[self.TP]
-            if self.MARKERS["SPA"] in current:  # Normal message
-                flags = current[:current.index(self.MARKERS["SPA"])]
-                current = current[current.index(self.MARKERS["SPA"]) + 1:]
-                logger.debug("TP:%d, Flags:%s @ %s" % (self.TP, flags, current))
-                self.scene.append([current, flags])
-                self.TP += 1
-            else:  # Command
-                flags = current[0]
-                command = current[1:]
-                logger.debug("Action: %s %s" % (flags, command))
-                if flags in self.actions:
-                    self.actions[flags](command)
-
+        try:
+            for entry in COMPILER.execute(program, cursor, max_stack):
+                self.scene.append(entry)
+                yield entry
+        finally:
+            self.TP = cursor.tp
+        self.finished = cursor.error is None
         logger.info("Finished Stack")
@@ -0,0 +1,166 @@
+import unittest
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from Imports.TYPEWRITER.STORYBOARD import ANALYZER, COMPILER, READER, SERVER, STORYBOARD
+
+
+class ServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.story_file = os.path.join(self.directory.name, "STORY.txt")
+        with open(self.story_file, "w") as story:
+            story.write("~Hello\nNPC1~Hi\n^5\n~Bye\n#\n~Jumped\n/\n/\nbad\n")
+        self.server = SERVER.StoryServer(self.story_file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_session(self, *requests):
+        async def session():
+            transport = SERVER.LocalTransport(self.server)
+            responses = [await transport.request(**request) for request in requests]
+            await transport.close()
+            return responses
+
+        return asyncio.run(session())
+
+    def test_server_scene_pages(self):
+        start, rest, after = self.run_session({"cmd": "start", "tp": 0, "limit": 2, "id": 1},
+                                               {"cmd": "next", "limit": 10},
+                                               {"cmd": "next"})
+
+        # Pages join up to the same scene Storyboard gives
+        self.assertEqual(start["id"], 1, msg="Request id not copied to response.")
+        self.assertFalse(start["done"], msg="Scene finished early.")
+        self.assertEqual(start["entries"] + rest["entries"], STORYBOARD.Storyboard(self.story_file).get_scene(0),
+                         msg="Served scene not as expected.")
+        self.assertTrue(rest["done"], msg="Scene not finished.")
+        self.assertIsNone(rest["error"], msg="Scene finished with an error.")
+        self.assertEqual(after["entries"], [], msg="Entries read after the end of the scene.")
+
+    def test_server_errors(self):
+        unbalanced, bad, outside, unknown, missing = self.run_session({"cmd": "start", "tp": 7},
+                                                                      {"cmd": "start", "tp": 8},
+                                                                      {"cmd": "start", "tp": 99},
+                                                                      {"cmd": "jump"},
+                                                                      {"cmd": "start"})
+
+        self.assertTrue(unbalanced["done"] and "return without a jump" in unbalanced["error"],
+                        msg="Return without a jump not reported.")
+        self.assertTrue(bad["done"] and "unknown command" in bad["error"], msg="Unknown command not reported.")
+        self.assertTrue(outside["done"] and "outside the story" in outside["error"], msg="Bad TP not reported.")
+        self.assertIn("error", unknown, msg="Unknown request not reported.")
+        self.assertIn("error", missing, msg="Missing TP not reported.")
+
+    def test_server_sessions(self):
+        async def sessions():
+            transports = [SERVER.LocalTransport(self.server) for _ in range(100)]
+            responses = await asyncio.gather(*(transport.request(cmd="start", tp=tp % 2, limit=1)
+                                               for tp, transport in enumerate(transports)))
+            open_sessions = self.server.sessions
+            for transport in transports:
+                await transport.close()
+            return responses, open_sessions
+
+        responses, open_sessions = asyncio.run(sessions())
+
+        # Sessions keep their own place in the shared story
+        self.assertEqual(open_sessions, 100, msg="Sessions not open at once.")
+        self.assertEqual([response["entries"] for response in responses[:2]], [[["Hello", ""]], [["Hi", "NPC1"]]],
+                         msg="Sessions not independent.")
+        self.assertEqual(self.server.sessions, 0, msg="Sessions not closed.")
+
+    def test_server_loads_once(self):
+        with mock.patch.object(self.server, "load_story", wraps=self.server.load_story) as load_story:
+            self.run_session({"cmd": "start", "tp": 0}, {"cmd": "start", "tp": 5})
+
+            # An unchanged story already compiled is used without going through a worker thread
+            self.assertEqual(load_story.call_count, 1, msg="Unchanged story loaded again.")
+            with open(self.story_file, "a") as story:
+                story.write("~More\n#\n")
+            self.run_session({"cmd": "start", "tp": 0})
+            self.assertEqual(load_story.call_count, 2, msg="Changed story not loaded again.")
+
+    def test_concurrent_load(self):
+        compile_story = COMPILER.compile_story
+        barrier = threading.Barrier(8)
+
+        def slow_compile(data, digest=None):
+            time.sleep(0.05)  # Long enough for every thread to reach load
+            return compile_story(data, digest)
+
+        def load(_):
+            barrier.wait()
+            return COMPILER.load(self.story_file)
+
+        # Threads loading the same story wait for one compile and share its Program
+        with mock.patch.object(COMPILER, "compile_story", side_effect=slow_compile) as compiled:
+            with ThreadPoolExecutor(8) as executor:
+                programs = list(executor.map(load, range(8)))
+        self.assertEqual(compiled.call_count, 1, msg="Story compiled more than once.")
+        self.assertTrue(all(program is programs[0] for program in programs), msg="Threads got different Programs.")
+        self.assertEqual(os.listdir(os.path.dirname(COMPILER.cache_path(self.story_file))),
+                         [os.path.basename(COMPILER.cache_path(self.story_file))],
+                         msg="Temporary compiled story left behind.")
+
+    def test_analyzer(self):
+        analysis = ANALYZER.analyse_program(COMPILER.load(self.story_file))
+        looping = ANALYZER.analyse_program(COMPILER.compile_story(b"~Loop\n^0\n#\n"))
+
+        self.assertEqual(analysis.scenes[0], (0, 4, 1, None), msg="Scene not followed to its end.")
+        self.assertIn("return without a jump", analysis.scenes[5].error, msg="Return without a jump not found.")
+        self.assertEqual(analysis.unreachable, [7, 8], msg="Unreachable lines not found.")
+        self.assertTrue(analysis.safe(0) and not analysis.safe(5), msg="Scene safety not as expected.")
+        self.assertIn("unbounded recursion", looping.scenes[0].error, msg="Unbounded recursion not found.")
+        self.assertEqual((analysis.limit(0), analysis.limit(0, 0), analysis.limit(5)), (None, 0, 1),
+                         msg="Return stack limits not as expected.")
+
+    def test_storyboard_recursion(self):
+        with open(self.story_file, "w") as story:
+            story.write("~Loop\n^0\n#\n")
+
+        # A scene recursing forever is stopped once its return stack is deeper than the story has jumps
+        for stream in (False, True):
+            storyboard = STORYBOARD.Storyboard(self.story_file, stream=stream)
+            scene = storyboard.get_scene(0)
+            self.assertFalse(storyboard.finished, msg="Recursing scene finished.")
+            self.assertEqual(len(scene), 2 if not stream else storyboard.MAX_STACK + 1,
+                             msg="Recursing scene not stopped.")
+
+    def test_scene_cache_copies(self):
+        storyboard = STORYBOARD.Storyboard(self.story_file)
+        scene = storyboard.get_scene(0)
+        expected = [list(entry) for entry in scene]
+
+        # Changing a scene, first run or cached, does not change the cached scene
+        scene[0][0] = "Changed"
+        scene.append(["Added", ""])
+        cached = storyboard.get_scene(0)
+        self.assertEqual(cached, expected, msg="Cached scene changed through the first run.")
+        cached[0][0] = "Changed"
+        self.assertEqual(storyboard.get_scene(0), expected, msg="Cached scene changed through a cached run.")
+
+    def test_line_breaks(self):
+        with open(self.story_file, "w", newline="") as story:
+            story.write("~Form\x0cfeed\r\n~Tab\x0bline\r~Group\x1d\x1e\x1c\n~Next\x85line\u2028\u2029\n#\n~Last\n#")
+        program, reader = COMPILER.load(self.story_file), READER.open_story(self.story_file)
+
+        # Both backends split on the same line breaks, so TPs agree
+        self.assertEqual(len(program), 7, msg="Compiled story lines not as expected.")
+        self.assertEqual(len(reader), len(program), msg="Streamed story lines not as expected.")
+        for tp in (0, 5):
+            compiled = STORYBOARD.Storyboard(self.story_file).get_scene(tp)
+            streamed = STORYBOARD.Storyboard(self.story_file, stream=True).get_scene(tp)
+            self.assertEqual(streamed, compiled, msg="Backends disagree on the scene at TP %d." % tp)
+        self.assertEqual(compiled, [["Last", ""]], msg="Scene after breaks not as expected.")
+        self.assertEqual(STORYBOARD.Storyboard(self.story_file).get_scene(0)[3], ["Next\x85line\u2028\u2029", ""],
+                         msg="Unicode line separators not kept in the message.")
+
+
+if __name__ == "__main__":
+    unittest.main()
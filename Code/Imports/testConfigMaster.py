@@ -0,0 +1,130 @@
+import unittest
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from unittest import mock
+from Code.Imports import ConfigMaster
+from Code.Imports.ConfigMaster import Config, ConfigWatcher
+
+
+class ConfigTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config_file = os.path.join(self.directory.name, "config.yaml")
+        self.write_config("First:\n  Size: 1\n  Name: \"a\"\nSecond:\n  Size: 2\n")
+        self.config_path = Config.resolve_config_path(self.source("module.py"))
+
+    def tearDown(self):
+        Config._registry.pop(self.config_path, None)
+        Config._keys.pop(self.config_path, None)
+        for key in [key for key in Config._subscribers if key[0] == self.config_path]:
+            del Config._subscribers[key]
+        self.directory.cleanup()
+
+    def source(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def write_config(self, text):
+        with open(self.config_file, "w") as file:
+            file.write(text)
+
+    def load(self):
+        """
+        Loads the config file as a new process would, returning its data and whether the YAML was parsed
+        """
+
+        Config._registry.pop(self.config_path, None)
+        with mock.patch.object(ConfigMaster.yaml, "load", wraps=ConfigMaster.yaml.load) as parse:
+            data = Config.load_config_file(self.config_path)
+        return data, parse.called
+
+    def test_config_registry(self):
+        first = Config("First", self.source("first.py"))
+        other = Config("First", self.source("other.py"))
+
+        # Modules next to the same config.yaml share one registry entry and one dictionary per module
+        self.assertEqual(first.config_path, Path(self.config_file).resolve(), msg="Config path not as expected.")
+        self.assertEqual(other.config_path, first.config_path, msg="Modules resolved to different config files.")
+        self.assertIs(other.data, first.data, msg="Module data not shared.")
+        self.assertIs(Config("Second", self.source("second.py")).data, Config._registry[first.config_path]["Second"],
+                      msg="Module data not from the registry entry.")
+        self.assertEqual((first["Size"], first.get("Missing", 3)), (1, 3), msg="Config values not as expected.")
+        with self.assertRaises(KeyError):
+            first["Missing"]
+
+        # Without a source, the file creating the Config object is used
+        namespace = {"Config": Config}
+        exec(compile("config = Config('Second')", self.source("caller.py"), "exec"), namespace)
+        self.assertEqual(namespace["config"].config_path, first.config_path, msg="Caller config path not as expected.")
+        with self.assertRaises(FileNotFoundError):
+            Config("First", os.path.join(self.directory.name, "missing", "module.py"))
+
+
+    def test_config_snapshot(self):
+        data, parsed = self.load()
+        self.assertTrue(parsed, msg="Config without a snapshot not parsed.")
+        self.assertTrue(Config.snapshot_path(self.config_path).exists(), msg="Snapshot not written.")
+
+        # An unchanged file is read from its snapshot
+        self.assertEqual(self.load(), (data, False), msg="Snapshot of an unchanged config not used.")
+
+        # Edits changing the size or only the modification time are parsed again
+        self.write_config("First:\n  Size: 10\n")
+        self.assertEqual(self.load(), ({"First": {"Size": 10}}, True), msg="Resized config not parsed again.")
+        stat = os.stat(self.config_file)
+        self.write_config("First:\n  Size: 20\n")
+        os.utime(self.config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(self.load(), ({"First": {"Size": 20}}, True), msg="Modified config not parsed again.")
+        self.assertEqual(self.load(), ({"First": {"Size": 20}}, False), msg="Rebuilt snapshot not used.")
+
+    def test_config_snapshot_invalid(self):
+        self.load()
+        snapshot_path = Config.snapshot_path(self.config_path)
+        expected = {"First": {"Size": 1, "Name": "a"}, "Second": {"Size": 2}}
+
+        # Corrupt snapshots, and snapshots naming something that no longer exists, fall back to the YAML
+        key = Config.snapshot_key(self.config_path)
+        missing = pickle.dumps((key, {"First": ConfigTestCase})).replace(b"ConfigTestCase", b"MissingTestCas")
+        for raw in (b"", b"corrupt", pickle.dumps(key)[:-3], pickle.dumps("key"), missing):
+            snapshot_path.write_bytes(raw)
+            self.assertEqual(self.load(), (expected, True), msg=f"Invalid snapshot {raw!r} used.")
+        self.assertEqual(self.load(), (expected, False), msg="Snapshot not rewritten after an invalid one.")
+
+        # Data that cannot be pickled is still loaded, without a snapshot
+        snapshot_path.unlink()
+        with mock.patch.object(ConfigMaster.yaml, "load", return_value={"First": {"Parse": lambda: None}}):
+            data = Config.parse_config_file(self.config_path)
+        self.assertEqual(list(data["First"]), ["Parse"], msg="Unpicklable config not loaded.")
+        self.assertEqual(os.listdir(snapshot_path.parent), [], msg="Snapshot left for unpicklable config.")
+
+
+    def test_config_watcher(self):
+        first, second = Config("First", self.source("first.py")), Config("Second", self.source("second.py"))
+        data, calls = first.data, []
+        first.subscribe(lambda updated: calls.append(("First", dict(updated))))
+        second.subscribe(lambda updated: calls.append(("Second", dict(updated))))
+        second.data
+        watcher = ConfigWatcher()
+
+        # Nothing is reloaded while the file is unchanged
+        self.assertEqual(watcher.check(), [], msg="Unchanged config reloaded.")
+
+        # Only subscribers of modules that changed are called, and module data is updated in place
+        self.write_config("First:\n  Size: 3\n  Name: \"a\"\nSecond:\n  Size: 2\n")
+        stat = os.stat(self.config_file)
+        os.utime(self.config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(watcher.check(), [self.config_path], msg="Changed config not reloaded.")
+        self.assertEqual(calls, [("First", {"Size": 3, "Name": "a"})], msg="Subscriber calls not as expected.")
+        self.assertIs(first.data, data, msg="Module data not updated in place.")
+        self.assertEqual(data["Size"], 3, msg="Module data not updated.")
+        self.assertEqual(watcher.check(), [], msg="Reloaded config reloaded again.")
+
+        # A file that fails to parse keeps its configuration
+        self.write_config("First: [\n")
+        self.assertEqual(watcher.check(), [self.config_path], msg="Broken config not checked.")
+        self.assertEqual((data["Size"], len(calls)), (3, 1), msg="Broken config changed the configuration.")
+
+
+if __name__ == '__main__':
+    unittest.main()